@@ -7,24 +7,38 @@ Production-ready with retry logic, rate limiting, and graceful shutdown.
 """
 
 import asyncio
+import atexit
 import html
+import io
 import json
 import logging
 import os
+import queue
 import random
 import re
 import signal
-import sys
-import tempfile
+import sqlite3
 import time
+from bisect import bisect_right
+from collections import OrderedDict, defaultdict, deque
+from contextlib import closing
+from dataclasses import dataclass, field
 from datetime import datetime
-from functools import wraps
-from pathlib import Path
+from functools import lru_cache, wraps
+from logging.handlers import QueueHandler, QueueListener
+from operator import itemgetter
 from typing import Callable, Dict, Optional, List, Any
 
 from aiohttp import web
 from dotenv import load_dotenv
-from groq import AsyncGroq, RateLimitError, APIError, APIConnectionError, APITimeoutError
+from groq import (
+    AsyncGroq,
+    RateLimitError,
+    APIError,
+    APIConnectionError,
+    APITimeoutError,
+    AuthenticationError,
+)
 import httpx
 import ssl
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
@@ -37,19 +51,33 @@ from telegram.ext import (
     filters,
 )
 
+# Optional faster event loop (not available on Windows); the default asyncio loop is used without it
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Configure logging for production
+# Configure logging for production. Records are passed through a queue to a
+# background thread that writes them, so logging never blocks the event loop on I/O.
 log_level = os.getenv("LOG_LEVEL", "INFO").upper()
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - [%(funcName)s] %(message)s",
-    level=getattr(logging, log_level, logging.INFO)
+log_stream_handler = logging.StreamHandler()
+log_stream_handler.setFormatter(
+    logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - [%(funcName)s] %(message)s")
 )
+log_queue: queue.SimpleQueue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, log_stream_handler)
+root_logger = logging.getLogger()
+root_logger.addHandler(QueueHandler(log_queue))
+root_logger.setLevel(getattr(logging, log_level, logging.INFO))
+log_listener.start()
+atexit.register(log_listener.stop)  # Flush queued records on exit
 logger = logging.getLogger(__name__)
 
 # Log startup without sensitive data
-logger.info(f"Starting bot with log level: {log_level}")
+logger.info("Starting bot with log level: %s", log_level)
 
 # Supported languages (will be used for validation)
 SUPPORTED_LANGUAGES = {
@@ -67,6 +95,22 @@ SUPPORTED_LANGUAGES = {
     "hindi": "hi",
 }
 
+# Precomputed views of the supported languages (the dict never changes)
+SUPPORTED_LANGUAGES_SORTED = sorted(SUPPORTED_LANGUAGES.items())
+SUPPORTED_LANGUAGES_LIST = ", ".join(name for name, _ in SUPPORTED_LANGUAGES_SORTED)
+SUPPORTED_LANGUAGES_BULLETS = "\n".join(f"- {name}" for name, _ in SUPPORTED_LANGUAGES_SORTED)
+
+# Reverse mapping: language code -> language name (e.g. "es" -> "spanish")
+CODE_TO_LANG_NAME = {code: name for name, code in SUPPORTED_LANGUAGES.items()}
+
+# Flag emojis shown on the language selection buttons
+LANGUAGE_FLAGS = {
+    "english": "🇬🇧", "spanish": "🇪🇸", "french": "🇫🇷",
+    "german": "🇩🇪", "italian": "🇮🇹", "portuguese": "🇵🇹",
+    "russian": "🇷🇺", "chinese": "🇨🇳", "japanese": "🇯🇵",
+    "korean": "🇰🇷", "arabic": "🇸🇦", "hindi": "🇮🇳"
+}
+
 # OpenTDB Trivia Categories (fetched from https://opentdb.com/api_category.php)
 # Format: {id: russian_name}
 TRIVIA_CATEGORIES = {
@@ -113,31 +157,334 @@ LANGUAGE_NAMES = {
     "hi": "Hindi",
 }
 
-# In-memory storage for user language preferences
+# Bound lookup for the translation hot paths (skips the attribute lookup per call)
+get_language_name = LANGUAGE_NAMES.get
+
+# Unicode blocks of the languages with their own script, used to recognise text
+# that is already in the target language. Latin-script languages are not listed:
+# telling them apart needs the model. Devanagari is left out too (Hindi, Marathi
+# and Nepali share it almost letter for letter), and CJK ideographs only count
+# towards Japanese alongside kana: on their own they may be Chinese or Japanese.
+# Format: (first_code_point, last_code_point, script)
+LANGUAGE_SCRIPT_RANGES = (
+    (0x0400, 0x04FF, "ru"),  # Cyrillic
+    (0x0600, 0x06FF, "ar"),  # Arabic
+    (0x3040, 0x30FF, "ja"),  # Hiragana and Katakana
+    (0x4E00, 0x9FFF, "han"),  # CJK Unified Ideographs (Chinese, Japanese kanji)
+    (0xAC00, 0xD7AF, "ko"),  # Hangul Syllables
+)
+
+# Letters from the blocks above that belong to other languages sharing the script
+# (Ukrainian, Belarusian, Serbian, Macedonian, Kazakh... Cyrillic; Persian/Urdu
+# Arabic). A text containing any of them is never treated as a match.
+NON_TARGET_SCRIPT_LETTERS = frozenset(
+    "іїєґўђјљњћџѓќѕәғқңөұүһ"
+    "ІЇЄҐЎЂЈЉЊЋЏЃЌЅӘҒҚҢӨҰҮҺ"
+    "پچژگکیٹڈڑںےہھ"
+)
+
+# Languages whose script is shared with languages that have no letters of their own
+# (Bulgarian Cyrillic has none of ы/э/ё): the text must contain one of these letters
+SCRIPT_REQUIRED_LETTERS = {
+    "ru": frozenset("ыэёЫЭЁ"),
+}
+
+# Share of letters that must be in the target language's script to skip translation
+SCRIPT_DOMINANCE_THRESHOLD = 0.9
+
+
+@dataclass(slots=True, frozen=True)
+class TriviaQuestion:
+    """
+    A single trivia question, validated once when built from OpenTDB data.
+
+    Attributes:
+        claim: The question text (translated)
+        answer: For boolean: True/False, for multiple: index of the correct option
+        type: "boolean" or "multiple"
+        options: For multiple choice: the 4 answer options (translated, shuffled)
+        explanation: Always "N/A" since OpenTDB doesn't provide explanations
+    """
+    claim: str
+    answer: bool | int
+    type: str = "boolean"
+    options: tuple[str, ...] = ()
+    explanation: str = "N/A"
+
+
+@dataclass(slots=True)
+class TriviaGame:
+    """
+    State of one user's trivia game.
+
+    Attributes:
+        questions: The questions of this game (10 per game)
+        language_code: Language the questions were translated to
+        category_id: OpenTDB category ID
+        category_name: Category name shown to the user
+        current_index: Index of the question currently being answered
+        score: Number of correct answers so far
+        active: False once the game has ended
+        last_activity: time.monotonic() of the last start/answer (for pruning)
+    """
+    questions: list[TriviaQuestion]
+    language_code: str
+    category_id: int
+    category_name: str
+    current_index: int = 0
+    score: int = 0
+    active: bool = True
+    last_activity: float = field(default_factory=time.monotonic)
+
+
+# In-memory storage for user language preferences (loaded from and persisted to SQLite)
 # Format: {user_id: language_code}
 user_preferences: Dict[int, str] = {}
 
-# In-memory storage for trivia game state
-# Format: {user_id: {questions: list, current_index: int, score: int, active: bool}}
-trivia_games: Dict[int, Dict[str, Any]] = {}
+# Preference updates not yet written to disk (write-behind)
+# Format: {user_id: language_code}
+pending_preference_writes: Dict[int, str] = {}
+preference_writer_task: Optional[asyncio.Task] = None
+
+# In-memory storage for trivia game state, least recently active games first
+# Format: {user_id: TriviaGame}
+trivia_games: OrderedDict[int, TriviaGame] = OrderedDict()
+
+# LRU cache of successful translations (most recently used entries last)
+# Format: {(language_code, text): translated_text}
+translation_cache: "OrderedDict[tuple[str, str], str]" = OrderedDict()
+
+# Per-user token buckets for voice message rate limiting (least recently used first)
+# Format: {user_id: (tokens, last_refill_time)}
+voice_rate_buckets: OrderedDict[int, tuple[float, float]] = OrderedDict()
+
+# Per-user token buckets for text translation rate limiting (least recently used first)
+# Format: {user_id: (tokens, last_refill_time)}
+text_rate_buckets: OrderedDict[int, tuple[float, float]] = OrderedDict()
+
+# When each user was last told their voice message is too short (oldest first)
+# Format: {user_id: monotonic_time}
+short_voice_notices: OrderedDict[int, float] = OrderedDict()
+
+# Pre-fetched question sets, so most trivia games start without waiting for OpenTDB and Groq
+# Format: {(category_id, language_code): deque[list[TriviaQuestion]]}
+trivia_question_pool: Dict[tuple[int, str], deque] = defaultdict(lambda: deque(maxlen=TRIVIA_POOL_SIZE))
+trivia_pool_refill_lock = asyncio.Lock()  # One background refill fetching at a time
+trivia_pool_refills_pending: set[tuple[int, str]] = set()
+trivia_pool_tasks: set[asyncio.Task] = set()  # Keeps refill tasks referenced
+
+# Every OpenTDB request goes through one throttle (see opentdb_get)
+opentdb_request_lock = asyncio.Lock()
+opentdb_last_request_time = float("-inf")  # Monotonic time the last request finished
+opentdb_players_waiting = 0  # Player requests queued or in flight
 
 # Groq client (initialized in main)
 groq_client: Optional[AsyncGroq] = None
 
+# HTTP client for the OpenTDB trivia API (initialized in main, reused across games)
+opentdb_client: Optional[httpx.AsyncClient] = None
+
 # Timeout configuration (in seconds)
 TRANSLATION_TIMEOUT = 30  # 30 seconds for text translation
 TRANSCRIPTION_TIMEOUT = 60  # 60 seconds for voice transcription
 FILE_DOWNLOAD_TIMEOUT = 30  # 30 seconds for file download
 
+# Matches Whisper errors caused by an unsupported or corrupt audio file
+AUDIO_FORMAT_ERROR_PATTERN = re.compile(r"format|codec|decode", re.IGNORECASE)
+
+# Voice message limits
+VOICE_RATE_LIMIT = 5  # Voice messages allowed per user per period
+VOICE_RATE_PERIOD = 30  # Rate limit period (in seconds)
+
+# Text translation limits (keeps one user's burst from using up the shared Groq quota)
+TEXT_RATE_LIMIT = 10  # Text messages allowed per user per period
+TEXT_RATE_PERIOD = 60  # Rate limit period (in seconds)
+SHORT_VOICE_NOTICE_COOLDOWN = 30  # Seconds between repeated "too short" replies to a user
+
+# Groq HTTP connection pool configuration
+GROQ_MAX_CONNECTIONS = 128
+GROQ_MAX_KEEPALIVE_CONNECTIONS = 64
+GROQ_CONNECT_TIMEOUT = 5.0  # Fail fast on unreachable hosts (seconds)
+GROQ_KEEPALIVE_EXPIRY = 30.0  # Idle connections kept for reuse between requests (seconds)
+GROQ_WARMUP_TIMEOUT = 5.0  # Max time startup waits for the warm-up request (seconds)
+
+# OpenTDB HTTP client configuration
+OPENTDB_API_URL = "https://opentdb.com/api.php"
+OPENTDB_TIMEOUT = 15.0  # Seconds
+OPENTDB_CONNECT_TIMEOUT = 3.0  # Fail fast on unreachable hosts (seconds)
+OPENTDB_MAX_CONNECTIONS = 4  # OpenTDB rate limits per IP, so a few connections suffice
+OPENTDB_KEEPALIVE_EXPIRY = 60.0  # Keep the idle connection between games (seconds)
+OPENTDB_REQUEST_INTERVAL = 5.0  # OpenTDB allows one request per IP every 5 seconds
+
+# Extracts the fields used from an OpenTDB result in one call (raises KeyError if one is missing)
+get_opentdb_fields = itemgetter("type", "question", "correct_answer", "incorrect_answers")
+
+# User preference persistence
+PREFERENCES_DB_PATH = os.getenv("PREFERENCES_DB_PATH", "user_preferences.db")
+PREFERENCES_FLUSH_INTERVAL = 0.5  # Seconds between write-behind flushes
+
+# Trivia games inactive for longer than this are discarded (in seconds)
+TRIVIA_GAME_TTL = 3600
+TRIVIA_MAX_GAMES = 10_000  # Least recently active games beyond this are discarded
+
+# Trivia question pool configuration
+TRIVIA_QUESTIONS_PER_GAME = 10
+TRIVIA_POOL_SIZE = 2  # Question sets kept ready per (category, language)
+TRIVIA_NEXT_QUESTION_DELAY = 1.0  # Seconds the answer feedback is shown before the next question
+TRIVIA_TRANSLATION_CHUNK_SIZE = 15  # Texts per parallel trivia batch translation request
+TRIVIA_TRANSLATION_CONCURRENCY = 4  # Max trivia translation requests in flight (all users)
+
+# Translation cache configuration
+TRANSLATION_CACHE_SIZE = 10_000  # Max number of cached translations
+TRANSLATION_CACHE_MAX_TEXT_LENGTH = 4096  # Longer texts are unlikely to repeat, so never cached
+
+# Output token budget for translations, scaled to the input length
+TRANSLATION_MIN_TOKENS = 64
+TRANSLATION_MAX_TOKENS = 1024  # Single text
+BATCH_TRANSLATION_MAX_TOKENS = 4096  # Batched trivia texts
+WIDE_SCRIPT_START = "\u2e80"  # CJK, kana and hangul (and above) are about one token per character
+
 # Retry configuration
 MAX_RETRIES = 3
 RETRY_DELAYS = [1, 2, 4]  # Exponential backoff: 1s, 2s, 4s
+RETRYABLE_STATUS_CODES = frozenset({500, 502, 503, 504})  # Transient server errors
+
+# Translation system prompts. They are identical for every user and target
+# language (the language goes in the user message), so all requests share
+# the same prompt prefix and can reuse Groq's cached prefix computation.
+TRANSLATION_SYSTEM_PROMPT = (
+    "You are a translator. Translate the user's text to the target language given "
+    "in brackets on the first line. Output only the translation, no explanations or additional text."
+)
+NUMBERED_TRANSLATION_SYSTEM_PROMPT = (
+    "You are a translator. The user's message gives the target language in brackets "
+    "on the first line, followed by numbered items. Translate each item to the target language. "
+    "Keep the same [N] markers and provide ONLY the translations, one per line. "
+    "Do not add explanations or additional text."
+)
+
+# ==============================================================================
+# User-facing messages
+# ==============================================================================
+
+# Welcome message for /start ({first_name} is filled in per user)
+WELCOME_MESSAGE_TEMPLATE = (
+    "Привет, {first_name}!\n\n"
+    "Я бот-переводчик на основе Groq AI. Я могу переводить текстовые сообщения "
+    "и расшифровывать голосовые сообщения на любой выбранный вами язык.\n\n"
+    "Доступные команды:\n"
+    "/start - Показать это приветственное сообщение\n"
+    "/setlang <язык> - Установить предпочитаемый язык перевода\n"
+    "/mylang - Показать текущий выбранный язык\n"
+    "/trivia - Сыграть в увлекательную игру Правда/Ложь\n"
+    "/help - Показать подробную справку по всем командам\n\n"
+    "Чтобы начать:\n"
+    "1. Введите /setlang, чтобы выбрать язык с помощью кнопок 🔘\n"
+    "2. Отправьте мне текстовое или голосовое сообщение, и я переведу его!\n"
+    "3. Хотите развлечься? Попробуйте /trivia для игры!\n\n"
+    "Совет: Вы также можете ввести /setlang spanish, чтобы установить язык напрямую."
+)
+
+# Detailed help for /help
+HELP_TEXT = (
+    "Бот-переводчик - Команды и использование\n\n"
+
+    "/start\n"
+    "Показать приветственное сообщение и основную информацию.\n\n"
+
+    "/setlang [язык]\n"
+    "Установить предпочитаемый язык перевода.\n"
+    "• Просто введите /setlang, чтобы увидеть кнопки выбора языка 🔘\n"
+    "• Или используйте: /setlang spanish\n"
+    "• Используйте /setlang help, чтобы увидеть все поддерживаемые языки.\n\n"
+
+    "/mylang\n"
+    "Показать ваш текущий выбранный язык.\n"
+    "Показывает 'не установлен', если вы еще не выбрали язык.\n\n"
+
+    "/trivia\n"
+    "Сыграть в увлекательную игру-викторину!\n"
+    "• Выберите категорию из 24+ вариантов (История, Наука, Спорт и др.)\n"
+    "• Ответьте на 10 вопросов на выбранном вами языке\n"
+    "• Вопросы бывают Правда/Ложь или множественный выбор\n"
+    "• Используйте кнопки для выбора ответа\n"
+    "• Получайте мгновенную обратную связь\n"
+    "• Посмотрите свой финальный счет в конце\n"
+    "• Играйте сколько угодно раз с новыми вопросами\n\n"
+
+    "/help\n"
+    "Показать это подробное справочное сообщение.\n\n"
+
+    "Как работает перевод:\n"
+    "1. Установите предпочитаемый язык с помощью /setlang\n"
+    "2. Отправьте любое текстовое или голосовое сообщение\n"
+    "3. Я переведу его на ваш язык с помощью Groq AI\n\n"
+
+    "Для голосовых сообщений:\n"
+    "- Отправьте голосовое сообщение на любом языке\n"
+    "- Бот расшифрует его с помощью Whisper large-v3\n"
+    "- Затем переведет на ваш предпочитаемый язык\n"
+    "- Если язык не установлен, вы увидите только расшифровку\n\n"
+
+    "Бот показывает как ваш оригинальный текст/расшифровку, так и перевод, "
+    "чтобы вы могли их сравнить.\n\n"
+
+    "Работает на Groq AI и Open Trivia Database:\n"
+    "- Перевод: модель Llama 3.3 70B\n"
+    "- Расшифровка: модель Whisper large-v3\n"
+    "- Вопросы викторины: Open Trivia Database (opentdb.com)\n"
+    "- Перевод викторины: модель Llama 3.3 70B"
+)
+
+# Reply to text messages sent before a language is chosen
+LANGUAGE_NOT_SET_MESSAGE = (
+    "Пожалуйста, сначала установите предпочитаемый язык перевода!\n\n"
+    "Используйте /setlang <язык> для установки.\n"
+    "Пример: /setlang spanish\n\n"
+    "Используйте /setlang help для просмотра всех поддерживаемых языков."
+)
+
+# Reply to /setlang without arguments (sent with the language keyboard)
+SETLANG_PROMPT_TEXT = (
+    "🌍 *Выберите предпочитаемый язык:*\n\n"
+    "Выберите из кнопок ниже, или используйте:\n"
+    "`/setlang <язык>`\n\n"
+    "Пример: `/setlang spanish`"
+)
+
+# Reply to /setlang help
+SETLANG_HELP_TEXT = (
+    f"Поддерживаемые языки:\n\n{SUPPORTED_LANGUAGES_BULLETS}\n\n"
+    "Использование: /setlang <язык>\n"
+    "Пример: /setlang french"
+)
+
+# Error for unsupported languages ({language} is filled in with the user's input)
+VALIDATION_ERROR_TEMPLATE = (
+    "Language '{language}' is not supported.\n\n"
+    f"Supported languages:\n{SUPPORTED_LANGUAGES_LIST}"
+)
+
+
+def jittered_delay(delays: List[float], attempt: int) -> float:
+    """
+    Pick a randomized backoff delay so concurrent retries don't fire in lockstep.
+
+    Args:
+        delays: Base delays per attempt
+        attempt: Zero-based attempt number
+
+    Returns:
+        Delay in seconds, uniformly spread around the base delay (0.5x-1.5x)
+    """
+    base = delays[min(attempt, len(delays) - 1)]
+    return random.uniform(base * 0.5, base * 1.5)
 
 
 def async_retry(max_retries: int = MAX_RETRIES, delays: list = None) -> Callable:
     """
     Decorator to retry async functions with exponential backoff.
-    Only retries on transient errors (5xx, network, timeout).
+    Only retries on transient errors (500/502/503/504, network, timeout).
     Does not retry on client errors (4xx) or rate limits (429).
 
     Args:
@@ -158,45 +505,47 @@ def async_retry(max_retries: int = MAX_RETRIES, delays: list = None) -> Callable
 
                 except RateLimitError as e:
                     # Don't retry rate limits - inform user immediately
-                    logger.warning(f"Rate limit hit in {func.__name__}: {e}")
+                    logger.warning("Rate limit hit in %s: %s", func.__name__, e)
                     raise
 
                 except (APIConnectionError, APITimeoutError) as e:
                     # Transient errors - retry with backoff
                     last_exception = e
                     if attempt < max_retries - 1:
-                        delay = delays[attempt] if attempt < len(delays) else delays[-1]
+                        delay = jittered_delay(delays, attempt)
                         logger.warning(
-                            f"Transient error in {func.__name__} (attempt {attempt + 1}/{max_retries}): {type(e).__name__}. "
-                            f"Retrying in {delay}s..."
+                            "Transient error in %s (attempt %s/%s): %s. Retrying in %.1fs...",
+                            func.__name__, attempt + 1, max_retries, type(e).__name__, delay,
                         )
                         await asyncio.sleep(delay)
                     else:
-                        logger.error(f"Max retries reached in {func.__name__}: {type(e).__name__}")
+                        logger.error("Max retries reached in %s: %s", func.__name__, type(e).__name__)
 
                 except APIError as e:
-                    # Check if it's a 5xx server error (retriable) or 4xx client error (not retriable)
-                    error_str = str(e).lower()
-                    if "500" in error_str or "502" in error_str or "503" in error_str or "504" in error_str:
+                    # Check if it's a transient server error (retriable) or a client error (not retriable)
+                    status_code = getattr(e, "status_code", None)
+                    if status_code is None:
+                        status_code = getattr(getattr(e, "response", None), "status_code", None)
+                    if status_code in RETRYABLE_STATUS_CODES:
                         # Server error - retry
                         last_exception = e
                         if attempt < max_retries - 1:
-                            delay = delays[attempt] if attempt < len(delays) else delays[-1]
+                            delay = jittered_delay(delays, attempt)
                             logger.warning(
-                                f"Server error in {func.__name__} (attempt {attempt + 1}/{max_retries}): {e}. "
-                                f"Retrying in {delay}s..."
+                                "Server error in %s (attempt %s/%s): %s. Retrying in %.1fs...",
+                                func.__name__, attempt + 1, max_retries, e, delay,
                             )
                             await asyncio.sleep(delay)
                         else:
-                            logger.error(f"Max retries reached in {func.__name__}: {e}")
+                            logger.error("Max retries reached in %s: %s", func.__name__, e)
                     else:
                         # Client error (4xx) - don't retry
-                        logger.error(f"Client error in {func.__name__} (not retrying): {e}")
+                        logger.error("Client error in %s (not retrying): %s", func.__name__, e)
                         raise
 
                 except Exception as e:
                     # Unknown error - log and don't retry
-                    logger.error(f"Unexpected error in {func.__name__}: {type(e).__name__}: {e}")
+                    logger.error("Unexpected error in %s: %s: %s", func.__name__, type(e).__name__, e)
                     raise
 
             # All retries exhausted
@@ -217,25 +566,246 @@ def validate_language(language: str) -> tuple[bool, str]:
     Returns:
         Tuple of (is_valid, language_code_or_error_message)
     """
-    language_lower = language.lower()
+    language_code = SUPPORTED_LANGUAGES.get(language.casefold())
 
-    if language_lower in SUPPORTED_LANGUAGES:
-        return True, SUPPORTED_LANGUAGES[language_lower]
+    if language_code:
+        return True, language_code
 
     # Provide helpful error message with supported languages
-    supported_list = ", ".join(sorted(SUPPORTED_LANGUAGES.keys()))
-    error_msg = f"Language '{language}' is not supported.\n\nSupported languages:\n{supported_list}"
-    return False, error_msg
+    return False, VALIDATION_ERROR_TEMPLATE.format(language=language)
+
+
+def load_user_preferences(db_path: str) -> Dict[int, str]:
+    """
+    Load all saved language preferences, creating the database if needed.
+    Blocking - run it in a worker thread.
+
+    Args:
+        db_path: Path to the SQLite database file
+
+    Returns:
+        Dict mapping user_id to language_code
+    """
+    with closing(sqlite3.connect(db_path)) as conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS prefs (user_id INTEGER PRIMARY KEY, lang_code TEXT NOT NULL)"
+        )
+        return dict(conn.execute("SELECT user_id, lang_code FROM prefs"))
+
+
+def write_user_preferences(db_path: str, updates: Dict[int, str]) -> None:
+    """Write language preference updates to the database. Blocking - run it in a worker thread."""
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO prefs (user_id, lang_code) VALUES (?, ?)",
+            updates.items()
+        )
+
+
+def get_user_language(user_id: int) -> Optional[str]:
+    """
+    Get a user's preferred language code.
+
+    All saved preferences are loaded into memory at startup, so this never
+    touches the database.
+
+    Args:
+        user_id: Telegram user ID
+
+    Returns:
+        Language code, or None if the user has not chosen a language
+    """
+    return user_preferences.get(user_id)
+
+
+def save_user_preference(user_id: int, language_code: str) -> None:
+    """Set a user's language preference; it is written to disk by the next flush."""
+    user_preferences[user_id] = language_code
+    pending_preference_writes[user_id] = language_code
+
+
+async def flush_user_preferences() -> None:
+    """Write all pending preference updates to disk in one batch."""
+    if not pending_preference_writes:
+        return
+
+    updates = pending_preference_writes.copy()
+    pending_preference_writes.clear()
+
+    try:
+        await asyncio.to_thread(write_user_preferences, PREFERENCES_DB_PATH, updates)
+    except Exception as e:
+        logger.error("Failed to save user preferences (%s): %s", type(e).__name__, e)
+        # Retry on the next flush, unless a newer value arrived in the meantime
+        for user_id, language_code in updates.items():
+            pending_preference_writes.setdefault(user_id, language_code)
+
+
+async def preference_writer() -> None:
+    """Background task that periodically flushes preference updates to disk."""
+    while True:
+        await asyncio.sleep(PREFERENCES_FLUSH_INTERVAL)
+        await flush_user_preferences()
+
+
+def prune_trivia_games() -> None:
+    """
+    Discard trivia games that have been inactive for longer than TRIVIA_GAME_TTL,
+    and the least recently active ones while there are TRIVIA_MAX_GAMES or more
+    (leaving room for the game about to be added).
+    """
+    cutoff = time.monotonic() - TRIVIA_GAME_TTL
+    discarded = 0
+
+    # Games are ordered by last activity, so only the front of the dict needs checking
+    while trivia_games:
+        oldest_game = next(iter(trivia_games.values()))
+        if oldest_game.last_activity >= cutoff and len(trivia_games) < TRIVIA_MAX_GAMES:
+            break
+        trivia_games.popitem(last=False)
+        discarded += 1
+
+    if discarded:
+        logger.info("Discarded %s inactive trivia games", discarded)
+
+
+def touch_trivia_game(user_id: int, game_state: TriviaGame) -> None:
+    """Record activity in a trivia game, moving it to the most recently active end."""
+    game_state.last_activity = time.monotonic()
+    trivia_games.move_to_end(user_id)
+
+
+def consume_rate_limit_token(
+    buckets: OrderedDict[int, tuple[float, float]], user_id: int, capacity: int, period: float
+) -> bool:
+    """
+    Take one token from a user's token bucket.
+    Buckets hold up to `capacity` tokens and refill continuously over `period` seconds.
+    Buckets left unused for a whole period are full again, so they are discarded.
+
+    Args:
+        buckets: Token bucket storage for one kind of request
+        user_id: User ID
+        capacity: Max requests allowed in a burst
+        period: Seconds needed to refill an empty bucket
+
+    Returns:
+        True if the request is allowed, False if the user is over the limit
+    """
+    now = time.monotonic()
+
+    # Buckets are ordered by last use, so only the front of the dict needs checking
+    while buckets:
+        _, oldest_refill = next(iter(buckets.values()))
+        if now - oldest_refill < period:
+            break
+        buckets.popitem(last=False)
+
+    # Popped and re-added below, which moves the user's bucket to the end
+    tokens, last_refill = buckets.pop(user_id, (capacity, now))
+    tokens = min(capacity, tokens + (now - last_refill) * capacity / period)
+
+    if tokens < 1:
+        buckets[user_id] = (tokens, now)
+        return False
+
+    buckets[user_id] = (tokens - 1, now)
+    return True
+
+
+def detect_script_language(text: str) -> Optional[str]:
+    """
+    Guess the language of a text from the script of its letters.
+
+    Only languages with their own script are recognised (see LANGUAGE_SCRIPT_RANGES).
+    Text mixing kana with CJK ideographs counts as Japanese. The guess errs on the
+    side of None: a wrong match means the user gets no translation at all.
+
+    Args:
+        text: The text to inspect
+
+    Returns:
+        Language code if one script covers at least SCRIPT_DOMINANCE_THRESHOLD
+        of the letters, None otherwise (Latin text, mixed scripts, no letters,
+        or letters that point to another language sharing the script)
+    """
+    counts: Dict[str, int] = {}
+    letters = 0
+
+    for char in text:
+        if not char.isalpha():
+            continue
+        if char in NON_TARGET_SCRIPT_LETTERS:
+            return None
+        letters += 1
+        code_point = ord(char)
+        for first, last, script in LANGUAGE_SCRIPT_RANGES:
+            if first <= code_point <= last:
+                counts[script] = counts.get(script, 0) + 1
+                break
+
+    # Japanese writes kanji with the same ideographs as Chinese; without kana
+    # the ideographs can't be attributed to either language
+    han = counts.pop("han", 0)
+    if "ja" in counts:
+        counts["ja"] += han
+
+    if not counts:
+        return None
+
+    language_code = max(counts, key=counts.__getitem__)
+    if counts[language_code] < SCRIPT_DOMINANCE_THRESHOLD * letters:
+        return None
+
+    required_letters = SCRIPT_REQUIRED_LETTERS.get(language_code)
+    if required_letters and required_letters.isdisjoint(text):
+        return None
+    return language_code
+
+
+def get_cached_translation(text: str, target_language_code: str) -> Optional[str]:
+    """
+    Look up a previously successful translation.
+
+    Args:
+        text: The original text
+        target_language_code: Target language code (e.g., 'es', 'fr')
+
+    Returns:
+        The cached translation, or None if the text has not been translated yet
+    """
+    if len(text) > TRANSLATION_CACHE_MAX_TEXT_LENGTH:
+        return None
+    key = (target_language_code, text)
+    translated_text = translation_cache.get(key)
+    if translated_text is not None:
+        translation_cache.move_to_end(key)  # Mark as recently used
+    return translated_text
+
+
+def cache_translation(text: str, target_language_code: str, translated_text: str) -> None:
+    """Store a successful translation, evicting the least recently used entry when full."""
+    if len(text) > TRANSLATION_CACHE_MAX_TEXT_LENGTH:
+        return
+    key = (target_language_code, text)
+    translation_cache[key] = translated_text
+    translation_cache.move_to_end(key)
+
+    if len(translation_cache) > TRANSLATION_CACHE_SIZE:
+        translation_cache.popitem(last=False)
 
 
 @async_retry(max_retries=MAX_RETRIES)
-async def transcribe_audio(file_path: str) -> tuple[bool, str]:
+async def transcribe_audio(audio_data: bytes, filename: str, translate_to_english: bool = False) -> tuple[bool, str]:
     """
-    Transcribe audio file using Groq Whisper large-v3 model.
+    Transcribe audio using Groq Whisper large-v3 model.
     Includes automatic retry with exponential backoff for transient errors.
 
     Args:
-        file_path: Path to the audio file
+        audio_data: In-memory audio data
+        filename: File name sent with the upload (its extension tells Whisper the format)
+        translate_to_english: Use Whisper's translation task, which returns the speech
+                              translated to English instead of the original language
 
     Returns:
         Tuple of (success: bool, result: str)
@@ -247,19 +817,17 @@ async def transcribe_audio(file_path: str) -> tuple[bool, str]:
         return False, "Transcription service is not available. Please contact the administrator."
 
     try:
-        logger.info(f"Transcribing audio file: {file_path}")
-
-        # Open the audio file and send to Whisper API with timeout
-        with open(file_path, "rb") as audio_file:
-            transcription = await asyncio.wait_for(
-                groq_client.audio.transcriptions.create(
-                    file=(Path(file_path).name, audio_file.read()),
-                    model="whisper-large-v3",
-                    response_format="text",
-                    temperature=0.0,  # Deterministic transcription
-                ),
-                timeout=TRANSCRIPTION_TIMEOUT
-            )
+        logger.info("Transcribing audio file: %s", filename)
+
+        # Send the in-memory audio to Whisper API with timeout (enforced by the HTTP client)
+        endpoint = groq_client.audio.translations if translate_to_english else groq_client.audio.transcriptions
+        transcription = await endpoint.create(
+            file=(filename, audio_data),
+            model="whisper-large-v3",
+            response_format="text",
+            temperature=0.0,  # Deterministic transcription
+            timeout=TRANSCRIPTION_TIMEOUT,
+        )
 
         # The response is the transcribed text directly
         transcribed_text = transcription.strip()
@@ -268,25 +836,27 @@ async def transcribe_audio(file_path: str) -> tuple[bool, str]:
             logger.warning("Transcription returned empty text")
             return False, "Audio file appears to be empty or contains no speech."
 
-        logger.info(f"Transcription successful: {transcribed_text[:50]}...")
+        logger.info("Transcription successful")
         return True, transcribed_text
 
-    except asyncio.TimeoutError:
-        logger.error(f"Transcription timeout after {TRANSCRIPTION_TIMEOUT}s")
+    except APITimeoutError:
+        logger.error("Transcription timeout after %ss", TRANSCRIPTION_TIMEOUT)
         return False, f"Transcription took too long (>{TRANSCRIPTION_TIMEOUT}s). Please try a shorter voice message."
 
     except RateLimitError as e:
-        logger.warning(f"Transcription rate limit: {e}")
+        logger.warning("Transcription rate limit: %s", e)
         return False, "Transcription service is busy. Please wait a moment and try again."
 
+    except AuthenticationError as e:
+        logger.error("Transcription authentication failed: %s", e)
+        return False, "Transcription service authentication failed. Please contact the administrator."
+
     except Exception as e:
         error_type = type(e).__name__
-        logger.error(f"Transcription failed ({error_type}): {str(e)}")
+        logger.error("Transcription failed (%s): %s", error_type, e)
 
         # Provide user-friendly error messages
-        if "api_key" in str(e).lower() or "authentication" in str(e).lower():
-            return False, "Transcription service authentication failed. Please contact the administrator."
-        elif "format" in str(e).lower() or "codec" in str(e).lower():
+        if AUDIO_FORMAT_ERROR_PATTERN.search(str(e)):
             return False, "Audio format is not supported. Please try a different voice message."
         else:
             return False, f"Transcription failed: {error_type}. Please try again later."
@@ -304,8 +874,10 @@ async def batch_translate_texts(texts: list[str], target_language_code: str) ->
 
     Returns:
         Tuple of (success: bool, result: list[str] or error_message)
-        - On success: (True, list_of_translated_texts)
-        - On failure: (False, error_message)
+        - On success: (True, list_of_translated_texts), one per input text
+        - On failure: (False, error_message), including when the response has a
+          different number of lines than texts were sent: a merged or split line
+          shifts every later item, so no translation in it can be trusted
     """
     if not groq_client:
         logger.error("Groq client is not initialized")
@@ -314,78 +886,143 @@ async def batch_translate_texts(texts: list[str], target_language_code: str) ->
     if not texts:
         return True, []
 
-    target_language_name = LANGUAGE_NAMES.get(target_language_code, target_language_code)
+    target_language_name = get_language_name(target_language_code, target_language_code)
 
     try:
-        logger.info(f"Batch translating {len(texts)} texts to {target_language_name}...")
+        logger.info("Batch translating %s texts to %s...", len(texts), target_language_name)
 
         # Format texts with markers for parsing
         numbered_texts = "\n".join([f"[{i}] {text}" for i, text in enumerate(texts)])
 
         # Create chat completion request to Groq with timeout
-        chat_completion = await asyncio.wait_for(
-            groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"You are a translator. Translate each numbered item to {target_language_name}. "
-                                   f"Keep the same [N] markers and provide ONLY the translations, one per line. "
-                                   f"Do not add explanations or additional text."
-                    },
-                    {
-                        "role": "user",
-                        "content": numbered_texts
-                    }
-                ],
-                model="llama-3.3-70b-versatile",
-                temperature=0.3,  # Lower temperature for more consistent translations
-                max_tokens=4096,  # Increased for batch translations
-            ),
-            timeout=TRANSLATION_TIMEOUT * 2  # Double timeout for batch
+        chat_completion = await groq_client.chat.completions.create(
+            messages=[
+                {
+                    "role": "system",
+                    "content": NUMBERED_TRANSLATION_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": f"[Target language: {target_language_name}]\n{numbered_texts}"
+                }
+            ],
+            model="llama-3.3-70b-versatile",
+            temperature=0.3,  # Lower temperature for more consistent translations
+            max_tokens=translation_max_tokens(numbered_texts, BATCH_TRANSLATION_MAX_TOKENS),
+            timeout=TRANSLATION_TIMEOUT * 2,  # Double timeout for batch
         )
 
-        response_text = chat_completion.choices[0].message.content.strip()
+        choice = chat_completion.choices[0]
+        if choice.finish_reason == "length":
+            # The last items are missing or cut off mid-sentence
+            logger.warning("Batch translation of %s texts hit the token limit", len(texts))
+            return False, "Batch translation was cut off at the token limit"
+
+        response_text = choice.message.content.strip()
 
         # Parse translations back into list
         translated_texts = []
         for line in response_text.split('\n'):
             line = line.strip()
             if line:
-                # Remove the [N] marker if present
-                if line.startswith('[') and ']' in line:
-                    text = line[line.index(']')+1:].strip()
-                    translated_texts.append(text)
+                # Remove the [N] marker if present (single scan for the closing bracket)
+                marker_end = line.find(']') if line.startswith('[') else -1
+                if marker_end != -1:
+                    translated_texts.append(line[marker_end + 1:].strip())
                 else:
                     translated_texts.append(line)
 
         # Verify we got the expected number of translations
         if len(translated_texts) != len(texts):
-            logger.warning(f"Expected {len(texts)} translations but got {len(translated_texts)}")
-            # Pad with original texts if needed
-            while len(translated_texts) < len(texts):
-                translated_texts.append(texts[len(translated_texts)])
+            logger.warning("Expected %s translations but got %s", len(texts), len(translated_texts))
+            return False, f"Expected {len(texts)} translations but got {len(translated_texts)}"
 
-        logger.info(f"Batch translation successful: {len(translated_texts)} texts translated")
-        return True, translated_texts[:len(texts)]  # Return only the expected count
+        logger.info("Batch translation successful: %s texts translated", len(translated_texts))
+        return True, translated_texts
 
-    except asyncio.TimeoutError:
-        logger.error(f"Batch translation timeout")
+    except APITimeoutError:
+        logger.error("Batch translation timeout")
         return False, f"Batch translation took too long. Please try again."
 
     except RateLimitError as e:
-        logger.warning(f"Batch translation rate limit: {e}")
+        logger.warning("Batch translation rate limit: %s", e)
         return False, "Translation service is busy. Please wait a moment and try again."
 
     except Exception as e:
         error_type = type(e).__name__
-        logger.error(f"Batch translation failed ({error_type}): {str(e)}")
+        logger.error("Batch translation failed (%s): %s", error_type, e)
         return False, f"Translation error: {error_type}"
 
 
+def translation_max_tokens(text: str, limit: int) -> int:
+    """
+    Estimate an output token budget for translating the given text.
+
+    Input tokens are estimated as one per CJK, kana or hangul character and one
+    per 3 characters of other scripts; the translation gets 4 tokens per input token.
+
+    Args:
+        text: The text that will be sent for translation
+        limit: Upper bound for the budget
+
+    Returns:
+        The max_tokens value to send with the request
+    """
+    wide_chars = sum(char >= WIDE_SCRIPT_START for char in text)
+    input_tokens = wide_chars + (len(text) - wide_chars) // 3
+    return min(limit, max(TRANSLATION_MIN_TOKENS, input_tokens * 4))
+
+
+async def request_translation(text: str, target_language_code: str) -> tuple[str, bool]:
+    """
+    Translate a single text with the Groq API.
+
+    The output budget is estimated from the input; if the response is cut off at
+    that estimate, the request is sent once more with the full TRANSLATION_MAX_TOKENS.
+
+    Args:
+        text: The text to translate
+        target_language_code: Target language code (e.g., 'es', 'fr')
+
+    Returns:
+        Tuple of (translated_text, complete). complete is False when the response
+        was cut off even at TRANSLATION_MAX_TOKENS (raises on API errors and timeouts)
+    """
+    target_language_name = get_language_name(target_language_code, target_language_code)
+    max_tokens = translation_max_tokens(text, TRANSLATION_MAX_TOKENS)
+
+    while True:
+        # Create chat completion request to Groq with timeout (enforced by the HTTP client)
+        chat_completion = await groq_client.chat.completions.create(
+            messages=[
+                {
+                    "role": "system",
+                    "content": TRANSLATION_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": f"[Target language: {target_language_name}]\n{text}"
+                }
+            ],
+            model="llama-3.3-70b-versatile",
+            temperature=0.3,  # Lower temperature for more consistent translations
+            max_tokens=max_tokens,
+            timeout=TRANSLATION_TIMEOUT,
+        )
+
+        choice = chat_completion.choices[0]
+        if choice.finish_reason != "length":
+            return choice.message.content.strip(), True
+        if max_tokens >= TRANSLATION_MAX_TOKENS:
+            logger.warning("Translation of a %s-character text hit the token limit", len(text))
+            return choice.message.content.strip(), False
+        logger.info("Translation hit the estimated %s-token budget, retrying with %s", max_tokens, TRANSLATION_MAX_TOKENS)
+        max_tokens = TRANSLATION_MAX_TOKENS
+
+
 async def translate_text(text: str, target_language_code: str) -> tuple[bool, str]:
     """
     Translate text to the target language using Groq API.
-    Includes automatic retry with exponential backoff for transient errors.
 
     Args:
         text: The text to translate
@@ -400,53 +1037,41 @@ async def translate_text(text: str, target_language_code: str) -> tuple[bool, st
         logger.error("Groq client is not initialized")
         return False, "Translation service is not available. Please contact the administrator."
 
-    target_language_name = LANGUAGE_NAMES.get(target_language_code, target_language_code)
+    target_language_name = get_language_name(target_language_code, target_language_code)
 
-    try:
-        logger.info(f"Translating text to {target_language_name}: {text[:50]}...")
+    # Identical messages are common (greetings, forwards) - skip the API call on a cache hit
+    cached_translation = get_cached_translation(text, target_language_code)
+    if cached_translation is not None:
+        logger.info("Translation cache hit for %s", target_language_name)
+        return True, cached_translation
 
-        # Create chat completion request to Groq with timeout
-        chat_completion = await asyncio.wait_for(
-            groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"You are a translator. Translate the following text to {target_language_name}. "
-                                   f"Only provide the translation, no explanations or additional text."
-                    },
-                    {
-                        "role": "user",
-                        "content": text
-                    }
-                ],
-                model="llama-3.3-70b-versatile",
-                temperature=0.3,  # Lower temperature for more consistent translations
-                max_tokens=1024,
-            ),
-            timeout=TRANSLATION_TIMEOUT
-        )
-
-        translated_text = chat_completion.choices[0].message.content.strip()
-        logger.info(f"Translation successful: {translated_text[:50]}...")
+    try:
+        logger.info("Translating text to %s", target_language_name)
+
+        translated_text, complete = await request_translation(text, target_language_code)
+        # Never pass off a translation cut off at the token limit as the full text
+        if not complete:
+            return False, "The translation is too long. Please send a shorter text."
+        logger.info("Translation successful")
+        cache_translation(text, target_language_code, translated_text)
         return True, translated_text
 
-    except asyncio.TimeoutError:
-        logger.error(f"Translation timeout after {TRANSLATION_TIMEOUT}s")
+    except APITimeoutError:
+        logger.error("Translation timeout after %ss", TRANSLATION_TIMEOUT)
         return False, f"Translation took too long (>{TRANSLATION_TIMEOUT}s). Please try again with shorter text."
 
     except RateLimitError as e:
-        logger.warning(f"Translation rate limit: {e}")
+        logger.warning("Translation rate limit: %s", e)
         return False, "Translation service is busy. Please wait a moment and try again."
 
+    except AuthenticationError as e:
+        logger.error("Translation authentication failed: %s", e)
+        return False, "Translation service authentication failed. Please contact the administrator."
+
     except Exception as e:
         error_type = type(e).__name__
-        logger.error(f"Translation failed ({error_type}): {str(e)}")
-
-        # Provide user-friendly error messages
-        if "api_key" in str(e).lower() or "authentication" in str(e).lower():
-            return False, "Translation service authentication failed. Please contact the administrator."
-        else:
-            return False, f"Translation failed: {error_type}. Please try again later."
+        logger.error("Translation failed (%s): %s", error_type, e)
+        return False, f"Translation failed: {error_type}. Please try again later."
 
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -455,28 +1080,31 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     user_id = user.id
 
     # Log user activity without sensitive data
-    logger.info(f"User {user_id} started the bot")
-
-    welcome_message = (
-        f"Привет, {user.first_name}!\n\n"
-        "Я бот-переводчик на основе Groq AI. Я могу переводить текстовые сообщения "
-        "и расшифровывать голосовые сообщения на любой выбранный вами язык.\n\n"
-        "Доступные команды:\n"
-        "/start - Показать это приветственное сообщение\n"
-        "/setlang <язык> - Установить предпочитаемый язык перевода\n"
-        "/mylang - Показать текущий выбранный язык\n"
-        "/trivia - Сыграть в увлекательную игру Правда/Ложь\n"
-        "/help - Показать подробную справку по всем командам\n\n"
-        "Чтобы начать:\n"
-        "1. Введите /setlang, чтобы выбрать язык с помощью кнопок 🔘\n"
-        "2. Отправьте мне текстовое или голосовое сообщение, и я переведу его!\n"
-        "3. Хотите развлечься? Попробуйте /trivia для игры!\n\n"
-        "Совет: Вы также можете ввести /setlang spanish, чтобы установить язык напрямую."
-    )
+    logger.info("User %s started the bot", user_id)
+
+    welcome_message = WELCOME_MESSAGE_TEMPLATE.format(first_name=user.first_name)
 
     await update.message.reply_text(welcome_message)
 
 
+def build_language_keyboard() -> InlineKeyboardMarkup:
+    """Build the inline keyboard for language selection (buttons in rows of 2)."""
+    keyboard = []
+    for i in range(0, len(SUPPORTED_LANGUAGES_SORTED), 2):
+        row = []
+        for lang_name, lang_code in SUPPORTED_LANGUAGES_SORTED[i:i+2]:
+            flag = LANGUAGE_FLAGS.get(lang_name, "🌐")
+            button_text = f"{flag} {lang_name.capitalize()}"
+            row.append(InlineKeyboardButton(button_text, callback_data=f"lang_{lang_code}"))
+        keyboard.append(row)
+
+    return InlineKeyboardMarkup(keyboard)
+
+
+# The language keyboard never changes, so it is built once at import time
+LANGUAGE_KEYBOARD = build_language_keyboard()
+
+
 async def setlang_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /setlang command - set user's preferred language."""
     user_id = update.effective_user.id
@@ -484,33 +1112,9 @@ async def setlang_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     # Check if language argument was provided
     if not context.args:
         # Show inline keyboard with language options
-        keyboard = []
-
-        # Create buttons in rows of 2
-        languages_sorted = sorted(SUPPORTED_LANGUAGES.items())
-        for i in range(0, len(languages_sorted), 2):
-            row = []
-            for lang_name, lang_code in languages_sorted[i:i+2]:
-                # Use flag emojis for popular languages
-                flag_emojis = {
-                    "english": "🇬🇧", "spanish": "🇪🇸", "french": "🇫🇷",
-                    "german": "🇩🇪", "italian": "🇮🇹", "portuguese": "🇵🇹",
-                    "russian": "🇷🇺", "chinese": "🇨🇳", "japanese": "🇯🇵",
-                    "korean": "🇰🇷", "arabic": "🇸🇦", "hindi": "🇮🇳"
-                }
-                flag = flag_emojis.get(lang_name, "🌐")
-                button_text = f"{flag} {lang_name.capitalize()}"
-                row.append(InlineKeyboardButton(button_text, callback_data=f"lang_{lang_code}"))
-            keyboard.append(row)
-
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
         await update.message.reply_text(
-            "🌍 *Выберите предпочитаемый язык:*\n\n"
-            "Выберите из кнопок ниже, или используйте:\n"
-            "`/setlang <язык>`\n\n"
-            "Пример: `/setlang spanish`",
-            reply_markup=reply_markup,
+            SETLANG_PROMPT_TEXT,
+            reply_markup=LANGUAGE_KEYBOARD,
             parse_mode="Markdown"
         )
         return
@@ -519,12 +1123,7 @@ async def setlang_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     # Handle help request
     if language.lower() == "help":
-        supported_list = "\n".join(f"- {lang}" for lang in sorted(SUPPORTED_LANGUAGES.keys()))
-        await update.message.reply_text(
-            f"Поддерживаемые языки:\n\n{supported_list}\n\n"
-            "Использование: /setlang <язык>\n"
-            "Пример: /setlang french"
-        )
+        await update.message.reply_text(SETLANG_HELP_TEXT)
         return
 
     # Validate language
@@ -532,8 +1131,8 @@ async def setlang_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     if is_valid:
         language_code = result
-        user_preferences[user_id] = language_code
-        logger.info(f"User {user_id} set language to {language_code}")
+        save_user_preference(user_id, language_code)
+        logger.info("User %s set language to %s", user_id, language_code)
 
         await update.message.reply_text(
             f"Ваш предпочитаемый язык установлен на {language.capitalize()} ({language_code}).\n\n"
@@ -541,7 +1140,7 @@ async def setlang_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
     else:
         error_message = result
-        logger.info(f"User {user_id} attempted invalid language")
+        logger.info("User %s attempted invalid language", user_id)
         await update.message.reply_text(error_message)
 
 
@@ -549,45 +1148,24 @@ async def mylang_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     """Handle the /mylang command - show user's current language preference."""
     user_id = update.effective_user.id
 
-    if user_id in user_preferences:
-        language_code = user_preferences[user_id]
+    language_code = get_user_language(user_id)
+    if language_code:
         # Find the language name from the code
-        language_name = next(
-            (name for name, code in SUPPORTED_LANGUAGES.items() if code == language_code),
-            "Unknown"
-        )
+        language_name = CODE_TO_LANG_NAME.get(language_code, "Unknown")
 
-        logger.info(f"User {user_id} checked their language: {language_code}")
+        logger.info("User %s checked their language: %s", user_id, language_code)
         await update.message.reply_text(
             f"Ваш текущий выбранный язык: {language_name.capitalize()} ({language_code})\n\n"
             "Используйте /setlang <язык> для изменения."
         )
     else:
-        logger.info(f"User {user_id} checked language but none is set")
+        logger.info("User %s checked language but none is set", user_id)
 
         # Show inline keyboard for language selection
-        keyboard = []
-        languages_sorted = sorted(SUPPORTED_LANGUAGES.items())
-        for i in range(0, len(languages_sorted), 2):
-            row = []
-            for lang_name, lang_code in languages_sorted[i:i+2]:
-                flag_emojis = {
-                    "english": "🇬🇧", "spanish": "🇪🇸", "french": "🇫🇷",
-                    "german": "🇩🇪", "italian": "🇮🇹", "portuguese": "🇵🇹",
-                    "russian": "🇷🇺", "chinese": "🇨🇳", "japanese": "🇯🇵",
-                    "korean": "🇰🇷", "arabic": "🇸🇦", "hindi": "🇮🇳"
-                }
-                flag = flag_emojis.get(lang_name, "🌐")
-                button_text = f"{flag} {lang_name.capitalize()}"
-                row.append(InlineKeyboardButton(button_text, callback_data=f"lang_{lang_code}"))
-            keyboard.append(row)
-
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
         await update.message.reply_text(
             "Вы еще не установили предпочитаемый язык.\n\n"
             "🌍 *Выберите ваш язык:*",
-            reply_markup=reply_markup,
+            reply_markup=LANGUAGE_KEYBOARD,
             parse_mode="Markdown"
         )
 
@@ -597,104 +1175,55 @@ async def button_callback_router(update: Update, context: ContextTypes.DEFAULT_T
     query = update.callback_query
     callback_data = query.data
 
-    # Route to appropriate handler based on callback data prefix
-    if callback_data.startswith("lang_"):
-        await language_button_callback(update, context)
-    elif callback_data.startswith("trivia_"):
-        await trivia_button_callback(update, context)
+    # Route to appropriate handler based on callback data prefix ("lang_es" -> "lang", "es")
+    prefix, _, payload = callback_data.partition("_")
+    handler = CALLBACK_HANDLERS.get(prefix)
+
+    if handler:
+        await handler(update, context, payload)
     else:
         await query.answer()
-        logger.warning(f"Unknown callback data: {callback_data}")
+        logger.warning("Unknown callback data: %s", callback_data)
+
 
+async def language_button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                   language_code: str) -> None:
+    """
+    Handle inline keyboard button presses for language selection.
 
-async def language_button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle inline keyboard button presses for language selection."""
+    Args:
+        update: Telegram update with the callback query
+        context: Callback context
+        language_code: Callback data after the "lang_" prefix (e.g. "es")
+    """
     query = update.callback_query
     await query.answer()  # Acknowledge the button press
 
     user_id = update.effective_user.id
-    callback_data = query.data
-
-    # Extract language code from callback data (format: lang_en, lang_es, etc.)
-    if callback_data.startswith("lang_"):
-        language_code = callback_data[5:]  # Remove "lang_" prefix
 
-        # Find the language name
-        language_name = next(
-            (name for name, code in SUPPORTED_LANGUAGES.items() if code == language_code),
-            "Unknown"
-        )
+    # Find the language name
+    language_name = CODE_TO_LANG_NAME.get(language_code, "Unknown")
 
-        # Save user preference
-        user_preferences[user_id] = language_code
-        logger.info(f"User {user_id} set language to {language_code} via button")
+    # Save user preference
+    save_user_preference(user_id, language_code)
+    logger.info("User %s set language to %s via button", user_id, language_code)
 
-        # Update the message to show confirmation
-        await query.edit_message_text(
-            f"✅ *Язык установлен на {language_name.capitalize()} ({language_code})*\n\n"
-            "Теперь отправьте мне любое текстовое сообщение, и я переведу его!\n\n"
-            "Используйте /setlang для изменения языка в любое время.",
-            parse_mode="Markdown"
-        )
+    # Update the message to show confirmation
+    await query.edit_message_text(
+        f"✅ *Язык установлен на {language_name.capitalize()} ({language_code})*\n\n"
+        "Теперь отправьте мне любое текстовое сообщение, и я переведу его!\n\n"
+        "Используйте /setlang для изменения языка в любое время.",
+        parse_mode="Markdown"
+    )
 
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /help command - show detailed help."""
     user_id = update.effective_user.id
 
-    logger.info(f"User {user_id} requested help")
-
-    help_text = (
-        "Бот-переводчик - Команды и использование\n\n"
-
-        "/start\n"
-        "Показать приветственное сообщение и основную информацию.\n\n"
-
-        "/setlang [язык]\n"
-        "Установить предпочитаемый язык перевода.\n"
-        "• Просто введите /setlang, чтобы увидеть кнопки выбора языка 🔘\n"
-        "• Или используйте: /setlang spanish\n"
-        "• Используйте /setlang help, чтобы увидеть все поддерживаемые языки.\n\n"
-
-        "/mylang\n"
-        "Показать ваш текущий выбранный язык.\n"
-        "Показывает 'не установлен', если вы еще не выбрали язык.\n\n"
-
-        "/trivia\n"
-        "Сыграть в увлекательную игру-викторину!\n"
-        "• Выберите категорию из 24+ вариантов (История, Наука, Спорт и др.)\n"
-        "• Ответьте на 10 вопросов на выбранном вами языке\n"
-        "• Вопросы бывают Правда/Ложь или множественный выбор\n"
-        "• Используйте кнопки для выбора ответа\n"
-        "• Получайте мгновенную обратную связь\n"
-        "• Посмотрите свой финальный счет в конце\n"
-        "• Играйте сколько угодно раз с новыми вопросами\n\n"
-
-        "/help\n"
-        "Показать это подробное справочное сообщение.\n\n"
-
-        "Как работает перевод:\n"
-        "1. Установите предпочитаемый язык с помощью /setlang\n"
-        "2. Отправьте любое текстовое или голосовое сообщение\n"
-        "3. Я переведу его на ваш язык с помощью Groq AI\n\n"
-
-        "Для голосовых сообщений:\n"
-        "- Отправьте голосовое сообщение на любом языке\n"
-        "- Бот расшифрует его с помощью Whisper large-v3\n"
-        "- Затем переведет на ваш предпочитаемый язык\n"
-        "- Если язык не установлен, вы увидите только расшифровку\n\n"
-
-        "Бот показывает как ваш оригинальный текст/расшифровку, так и перевод, "
-        "чтобы вы могли их сравнить.\n\n"
-
-        "Работает на Groq AI и Open Trivia Database:\n"
-        "- Перевод: модель Llama 3.3 70B\n"
-        "- Расшифровка: модель Whisper large-v3\n"
-        "- Вопросы викторины: Open Trivia Database (opentdb.com)\n"
-        "- Перевод викторины: модель Llama 3.3 70B"
-    )
+    logger.info("User %s requested help", user_id)
 
-    await update.message.reply_text(help_text)
+    await update.message.reply_text(HELP_TEXT)
 
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -703,22 +1232,34 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     message_text = update.message.text
 
     # Log activity without message content for privacy
-    logger.info(f"User {user_id} sent text message for translation")
+    logger.info("User %s sent text message for translation", user_id)
 
-    # Check if user has set a language preference
-    if user_id not in user_preferences:
-        logger.info(f"User {user_id} has no language preference set")
+    # Get user's preferred language
+    target_language_code = get_user_language(user_id)
+    if not target_language_code:
+        logger.info("User %s has no language preference set", user_id)
+        await update.message.reply_text(LANGUAGE_NOT_SET_MESSAGE)
+        return
+
+    target_language_name = get_language_name(target_language_code, target_language_code)
+
+    # Skip the API call when the text is already written in the target language
+    if detect_script_language(message_text) == target_language_code:
+        logger.info("Text from user %s is already in %s, skipping translation", user_id, target_language_code)
         await update.message.reply_text(
-            "Пожалуйста, сначала установите предпочитаемый язык перевода!\n\n"
-            "Используйте /setlang <язык> для установки.\n"
-            "Пример: /setlang spanish\n\n"
-            "Используйте /setlang help для просмотра всех поддерживаемых языков."
+            f"Текст уже на языке {target_language_name}, перевод не требуется."
         )
         return
 
-    # Get user's preferred language
-    target_language_code = user_preferences[user_id]
-    target_language_name = LANGUAGE_NAMES.get(target_language_code, target_language_code)
+    # Per-user rate limit, checked before any Groq request; cache hits cost no quota
+    if get_cached_translation(message_text, target_language_code) is None and not consume_rate_limit_token(
+        text_rate_buckets, user_id, TEXT_RATE_LIMIT, TEXT_RATE_PERIOD
+    ):
+        logger.info("User %s exceeded the text message rate limit", user_id)
+        await update.message.reply_text(
+            "Слишком много сообщений. Пожалуйста, подождите немного и попробуйте снова."
+        )
+        return
 
     # Translate the message
     success, result = await translate_text(message_text, target_language_code)
@@ -730,7 +1271,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             f"Исходный текст:\n{message_text}\n\n"
             f"Перевод на {target_language_name}:\n{translated_text}"
         )
-        logger.info(f"Sent translation to user {user_id}")
+        logger.info("Sent translation to user %s", user_id)
     else:
         # Translation failed - show error and original text
         error_message = result
@@ -738,24 +1279,42 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             f"Исходный текст:\n{message_text}\n\n"
             f"Ошибка перевода: {error_message}"
         )
-        logger.warning(f"Translation failed for user {user_id}: {error_message}")
+        logger.warning("Translation failed for user %s: %s", user_id, error_message)
 
     await update.message.reply_text(response)
 
 
+def send_typing_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Show the typing indicator without waiting for Telegram to acknowledge it.
+    The request runs as a background task; since the indicator is cosmetic, a failure
+    only reaches the error handler's log (no update is attached, so the user gets no reply).
+    """
+    context.application.create_task(
+        context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+    )
+
+
 async def handle_voice_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle voice messages - transcribe and optionally translate them."""
     user_id = update.effective_user.id
     voice = update.message.voice
 
     # Log activity without sensitive data
-    logger.info(f"User {user_id} sent voice message (duration: {voice.duration}s, size: {voice.file_size} bytes)")
+    logger.info("User %s sent voice message (duration: %ss, size: %s bytes)", user_id, voice.duration, voice.file_size)
 
-    # Check voice message duration
+    # Cheap checks first: rejected messages never reach the Telegram file API or Groq
+    # Check voice message duration (repeated notices to the same user are suppressed)
     if voice.duration < 1:
-        await update.message.reply_text(
-            "Голосовое сообщение слишком короткое. Пожалуйста, отправьте более длинное сообщение."
-        )
+        now = time.monotonic()
+        # Notices older than the cooldown no longer suppress anything (oldest are first)
+        while short_voice_notices and now - next(iter(short_voice_notices.values())) >= SHORT_VOICE_NOTICE_COOLDOWN:
+            short_voice_notices.popitem(last=False)
+        if user_id not in short_voice_notices:
+            short_voice_notices[user_id] = now
+            await update.message.reply_text(
+                "Голосовое сообщение слишком короткое. Пожалуйста, отправьте более длинное сообщение."
+            )
         return
 
     # Check file size (Telegram max is 20MB, but we'll be more conservative)
@@ -767,50 +1326,72 @@ async def handle_voice_message(update: Update, context: ContextTypes.DEFAULT_TYP
         )
         return
 
+    # Check per-user rate limit
+    if not consume_rate_limit_token(voice_rate_buckets, user_id, VOICE_RATE_LIMIT, VOICE_RATE_PERIOD):
+        logger.info("User %s exceeded the voice message rate limit", user_id)
+        await update.message.reply_text(
+            "Слишком много голосовых сообщений. Пожалуйста, подождите немного и попробуйте снова."
+        )
+        return
+
     # Show typing indicator while processing
-    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+    send_typing_action(update, context)
 
-    # Use temporary file for voice message
-    temp_file = None
     try:
-        # Download voice file to temporary location with timeout
-        logger.info(f"Downloading voice file for user {user_id}...")
+        # Download voice file into memory with timeout (voice notes are small,
+        # so this avoids writing a temporary file and reading it back)
+        logger.info("Downloading voice file for user %s...", user_id)
         file = await voice.get_file()
 
-        # Create temporary file with .ogg extension (Telegram voice format)
-        with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as temp:
-            temp_file = temp.name
-            await asyncio.wait_for(
-                file.download_to_drive(temp_file),
-                timeout=FILE_DOWNLOAD_TIMEOUT
-            )
+        audio_buffer = io.BytesIO()
+        await asyncio.wait_for(
+            file.download_to_memory(out=audio_buffer),
+            timeout=FILE_DOWNLOAD_TIMEOUT
+        )
 
-        logger.info(f"Voice file downloaded successfully")
+        logger.info("Voice file downloaded successfully")
 
         # Send typing indicator again (transcription might take time)
-        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+        send_typing_action(update, context)
+
+        audio_data = audio_buffer.getvalue()
+        target_language_code = get_user_language(user_id)
+
+        if target_language_code == "en":
+            # Whisper translates speech to English itself: one upload and no separate
+            # translation call. It returns no original-language transcript, so the
+            # reply holds the translation only (uploading the audio a second time
+            # for the transcript would double the audio quota used per message)
+            speech_success, speech_result = await transcribe_audio(
+                audio_data, "voice.ogg", translate_to_english=True
+            )
+            if speech_success:
+                target_language_name = get_language_name(target_language_code, target_language_code)
+                await update.message.reply_text(f"Перевод на {target_language_name}:\n{speech_result}")
+                logger.info("Sent speech translation to user %s", user_id)
+                return
+            logger.warning("Speech translation failed for user %s, transcribing instead: %s", user_id, speech_result)
 
-        # Transcribe the audio
-        transcribe_success, transcribe_result = await transcribe_audio(temp_file)
+        # Transcribe the audio (.ogg extension: Telegram voice format)
+        transcribe_success, transcribe_result = await transcribe_audio(audio_data, "voice.ogg")
 
         if not transcribe_success:
             # Transcription failed
             error_message = transcribe_result
             response = f"Ошибка расшифровки: {error_message}"
-            logger.warning(f"Transcription failed for user {user_id}: {error_message}")
+            logger.warning("Transcription failed for user %s: %s", user_id, error_message)
             await update.message.reply_text(response)
             return
 
         transcribed_text = transcribe_result
-        logger.info(f"Transcription successful for user {user_id}")
+        logger.info("Transcription successful for user %s", user_id)
 
         # Check if user has a language preference for translation
-        if user_id in user_preferences:
-            target_language_code = user_preferences[user_id]
-            target_language_name = LANGUAGE_NAMES.get(target_language_code, target_language_code)
+        if target_language_code:
+            target_language_name = get_language_name(target_language_code, target_language_code)
 
             # Send typing indicator again (translation in progress)
-            await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+            send_typing_action(update, context)
 
             # Translate the transcribed text
             translate_success, translate_result = await translate_text(transcribed_text, target_language_code)
@@ -821,7 +1402,7 @@ async def handle_voice_message(update: Update, context: ContextTypes.DEFAULT_TYP
                     f"Расшифровка:\n{transcribed_text}\n\n"
                     f"Перевод на {target_language_name}:\n{translated_text}"
                 )
-                logger.info(f"Sent transcription and translation to user {user_id}")
+                logger.info("Sent transcription and translation to user %s", user_id)
             else:
                 # Translation failed, show transcription only
                 error_message = translate_result
@@ -829,44 +1410,115 @@ async def handle_voice_message(update: Update, context: ContextTypes.DEFAULT_TYP
                     f"Расшифровка:\n{transcribed_text}\n\n"
                     f"Ошибка перевода: {error_message}"
                 )
-                logger.warning(f"Translation failed for user {user_id}: {error_message}")
+                logger.warning("Translation failed for user %s: %s", user_id, error_message)
         else:
             # No language preference - show transcription only
             response = f"Расшифровка:\n{transcribed_text}\n\n" \
                       f"Чтобы получать переводы, установите язык с помощью /setlang <язык>"
-            logger.info(f"Sent transcription only to user {user_id} (no language preference)")
+            logger.info("Sent transcription only to user %s (no language preference)", user_id)
 
         await update.message.reply_text(response)
 
     except asyncio.TimeoutError:
-        logger.error(f"Voice file download timeout for user {user_id}")
+        logger.error("Voice file download timeout for user %s", user_id)
         await update.message.reply_text(
             f"Загрузка голосового файла заняла слишком много времени (>{FILE_DOWNLOAD_TIMEOUT}с). Пожалуйста, попробуйте файл меньшего размера."
         )
 
     except Exception as e:
         error_type = type(e).__name__
-        logger.error(f"Voice message handling failed for user {user_id} ({error_type}): {str(e)}")
+        logger.error("Voice message handling failed for user %s (%s): %s", user_id, error_type, e)
         await update.message.reply_text(
             f"Не удалось обработать голосовое сообщение: {error_type}. Пожалуйста, попробуйте снова."
         )
 
-    finally:
-        # Clean up temporary file
-        if temp_file and Path(temp_file).exists():
-            try:
-                Path(temp_file).unlink()
-                logger.debug(f"Deleted temporary file")
-            except Exception as e:
-                logger.error(f"Failed to delete temporary file: {e}")
-
 
 # ==============================================================================
 # Trivia Game Functions
 # ==============================================================================
 
+# Caps concurrent trivia translation requests across all games
+trivia_translation_semaphore = asyncio.Semaphore(TRIVIA_TRANSLATION_CONCURRENCY)
+
+
+async def translate_trivia_texts(texts: list[str], language_code: str) -> list[str]:
+    """
+    Translate trivia texts in chunks of TRIVIA_TRANSLATION_CHUNK_SIZE, run concurrently.
+    A shorter output per request finishes sooner, so the game waits for the slowest
+    chunk instead of one long response. Requests in flight are capped across all users.
+
+    Args:
+        texts: Texts to translate
+        language_code: Target language code
+
+    Returns:
+        Translated texts in the same order (the original text where a chunk failed,
+        including chunks whose response did not match the number of texts sent)
+    """
+    chunks = [texts[i:i + TRIVIA_TRANSLATION_CHUNK_SIZE] for i in range(0, len(texts), TRIVIA_TRANSLATION_CHUNK_SIZE)]
+
+    async def translate_chunk(chunk: list[str]) -> tuple[bool, Any]:
+        async with trivia_translation_semaphore:
+            return await batch_translate_texts(chunk, language_code)
+
+    results = await asyncio.gather(*(translate_chunk(chunk) for chunk in chunks))
+
+    translated_texts = []
+    for chunk, (success, result) in zip(chunks, results):
+        if not success:
+            logger.warning("Batch translation failed: %s, using English", result)
+            result = chunk  # Fallback to English
+        translated_texts.extend(result)
+
+    return translated_texts
+
+
+async def opentdb_get(params: dict, background: bool = False) -> httpx.Response:
+    """
+    Send a GET request to OpenTDB, at most one per OPENTDB_REQUEST_INTERVAL for the whole bot.
+
+    Players' requests are served first, in arrival order. Background requests
+    (pool refills) only take a slot when no player is waiting for one.
+
+    Args:
+        params: Query parameters
+        background: Whether the request is a background pool refill
+
+    Returns:
+        The HTTP response
+    """
+    global opentdb_last_request_time, opentdb_players_waiting
+
+    if background:
+        # Wait for an idle slot: no player queued and the interval since the last request elapsed
+        while True:
+            delay = opentdb_last_request_time + OPENTDB_REQUEST_INTERVAL - time.monotonic()
+            if opentdb_players_waiting or opentdb_request_lock.locked():
+                delay = max(delay, OPENTDB_REQUEST_INTERVAL)
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+    else:
+        opentdb_players_waiting += 1
+
+    try:
+        async with opentdb_request_lock:
+            delay = opentdb_last_request_time + OPENTDB_REQUEST_INTERVAL - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                return await opentdb_client.get(OPENTDB_API_URL, params=params)
+            finally:
+                opentdb_last_request_time = time.monotonic()
+    finally:
+        if not background:
+            opentdb_players_waiting -= 1
+
+
 @async_retry(max_retries=MAX_RETRIES)
-async def fetch_opentdb_questions(category_id: int = 0, language_code: str = "en", count: int = 10) -> tuple[bool, Any]:
+async def fetch_opentdb_questions(
+    category_id: int = 0, language_code: str = "en", count: int = 10, background: bool = False
+) -> tuple[bool, Any]:
     """
     Fetch trivia questions from Open Trivia Database API and translate them.
 
@@ -878,53 +1530,31 @@ async def fetch_opentdb_questions(category_id: int = 0, language_code: str = "en
         category_id: OpenTDB category ID (0 for all categories)
         language_code: Target language code for translation (e.g., "en", "es", "fr")
         count: Number of questions to fetch
+        background: Whether this is a background pool refill (yields to players' requests)
 
     Returns:
         Tuple of (success: bool, result: list or error_message)
-        - On success: (True, list_of_question_dicts)
+        - On success: (True, list_of_TriviaQuestion)
         - On failure: (False, error_message)
-
-    Question dict format:
-        {
-            "claim": str,  # The question text (translated)
-            "answer": bool or int,  # For boolean: True/False, for multiple: index 0-3
-            "options": list[str],  # For multiple choice: list of 4 answer options (translated, shuffled)
-            "type": str,  # "boolean" or "multiple"
-            "explanation": str  # Always "N/A" since OpenTDB doesn't provide explanations
-        }
     """
-    if not groq_client:
-        logger.error("Groq client is not initialized")
+    if not groq_client or not opentdb_client:
+        logger.error("Groq or OpenTDB client is not initialized")
         return False, "Trivia service is not available. Please contact the administrator."
 
-    language_name = LANGUAGE_NAMES.get(language_code, "English")
-
     try:
-        logger.info(f"Fetching {count} questions from OpenTDB (category: {category_id})...")
+        logger.info("Fetching %s questions from OpenTDB (category: %s)...", count, category_id)
 
-        # Build OpenTDB API URL
+        # Build OpenTDB API query
         # We fetch mixed type questions to get variety
-        url = f"https://opentdb.com/api.php?amount={count}"
+        params = {"amount": count}
         if category_id != 0:
-            url += f"&category={category_id}"
+            params["category"] = category_id
 
-        # Fetch questions from OpenTDB
-        # Honor SSL verification settings
-        disable_ssl = os.getenv("DISABLE_SSL_VERIFY", "false").lower() == "true"
-
-        if disable_ssl:
-            # Create SSL context with verification disabled
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-            async with httpx.AsyncClient(timeout=15.0, verify=ssl_context) as client:
-                response = await client.get(url)
-        else:
-            async with httpx.AsyncClient(timeout=15.0) as client:
-                response = await client.get(url)
+        # Fetch questions from OpenTDB over the shared keep-alive connection, within its rate limit
+        response = await opentdb_get(params, background=background)
 
         if response.status_code != 200:
-            logger.error(f"OpenTDB API returned status {response.status_code}")
+            logger.error("OpenTDB API returned status %s", response.status_code)
             return False, f"Failed to fetch questions from trivia database (HTTP {response.status_code})"
 
         data = response.json()
@@ -940,7 +1570,7 @@ async def fetch_opentdb_questions(category_id: int = 0, language_code: str = "en
                 5: "Rate limited. Please wait a few seconds and try again."
             }
             error_msg = error_messages.get(response_code, f"Unknown error (code {response_code})")
-            logger.error(f"OpenTDB error: {error_msg}")
+            logger.error("OpenTDB error: %s", error_msg)
             return False, error_msg
 
         opentdb_results = data.get("results", [])
@@ -949,16 +1579,22 @@ async def fetch_opentdb_questions(category_id: int = 0, language_code: str = "en
             logger.error("OpenTDB returned empty results")
             return False, "No questions available. Please try again."
 
-        logger.info(f"Fetched {len(opentdb_results)} questions from OpenTDB")
+        logger.info("Fetched %s questions from OpenTDB", len(opentdb_results))
 
-        # Step 1: Decode HTML entities for all questions and answers
+        # Step 1: Decode HTML entities for all questions and answers (skipping malformed results)
         decoded_questions = []
         for q in opentdb_results:
+            try:
+                question_type, question, correct_answer, incorrect_answers = get_opentdb_fields(q)
+            except (KeyError, TypeError):
+                logger.warning("Skipping malformed OpenTDB result")
+                continue
+
             decoded_questions.append({
-                "question": html.unescape(q["question"]),
-                "correct_answer": html.unescape(q["correct_answer"]),
-                "incorrect_answers": [html.unescape(ans) for ans in q["incorrect_answers"]],
-                "type": q["type"]
+                "question": html.unescape(question),
+                "correct_answer": html.unescape(correct_answer),
+                "incorrect_answers": [html.unescape(ans) for ans in incorrect_answers],
+                "type": question_type
             })
 
         # Step 2: Batch translate if not English
@@ -972,14 +1608,26 @@ async def fetch_opentdb_questions(category_id: int = 0, language_code: str = "en
                     texts_to_translate.append(q["correct_answer"])
                     texts_to_translate.extend(q["incorrect_answers"])
 
-            logger.info(f"Batch translating {len(texts_to_translate)} texts...")
+            # OpenTDB questions and answers repeat across games (and "True"/"False"-style
+            # answers across questions), so only texts missing from the cache are sent
+            translated_texts = [get_cached_translation(text, language_code) for text in texts_to_translate]
+            missing_indexes = [i for i, text in enumerate(translated_texts) if text is None]
+            missing_texts = [texts_to_translate[i] for i in missing_indexes]
+
+            logger.info(
+                "Batch translating %s texts (%s cached)...",
+                len(missing_texts), len(texts_to_translate) - len(missing_texts)
+            )
 
-            # Translate all texts in one call
-            success, translated_texts = await batch_translate_texts(texts_to_translate, language_code)
+            # Translate all uncached texts in parallel chunks
+            if missing_texts:
+                batch_result = await translate_trivia_texts(missing_texts, language_code)
 
-            if not success:
-                logger.warning(f"Batch translation failed: {translated_texts}, using English")
-                translated_texts = texts_to_translate  # Fallback to English
+                for i, original, translated in zip(missing_indexes, missing_texts, batch_result):
+                    translated_texts[i] = translated
+                    # Untranslated fallbacks (failed or mismatched chunks) are not cached
+                    if translated != original:
+                        cache_translation(original, language_code, translated)
 
             # Map translations back to questions
             translation_index = 0
@@ -1021,12 +1669,11 @@ async def fetch_opentdb_questions(category_id: int = 0, language_code: str = "en
                     # Boolean question
                     answer_bool = (q["correct_answer"].lower() == "true")
 
-                    processed_questions.append({
-                        "claim": q["translated_question"],
-                        "answer": answer_bool,
-                        "type": "boolean",
-                        "explanation": "N/A"  # OpenTDB doesn't provide explanations
-                    })
+                    processed_questions.append(TriviaQuestion(
+                        claim=q["translated_question"],
+                        answer=answer_bool,
+                        type="boolean",
+                    ))
 
                 elif q["type"] == "multiple":
                     # Multiple choice question
@@ -1038,32 +1685,31 @@ async def fetch_opentdb_questions(category_id: int = 0, language_code: str = "en
                     random.shuffle(answer_tuples)
 
                     # Extract shuffled answers and find correct index
-                    shuffled_answers = [ans for ans, _ in answer_tuples]
+                    shuffled_answers = tuple(ans for ans, _ in answer_tuples)
                     correct_index = next(i for i, (_, is_correct) in enumerate(answer_tuples) if is_correct)
 
-                    processed_questions.append({
-                        "claim": q["translated_question"],
-                        "answer": correct_index,  # Index of correct answer (0-3)
-                        "options": shuffled_answers,  # List of 4 shuffled answers
-                        "type": "multiple",
-                        "explanation": "N/A"
-                    })
+                    processed_questions.append(TriviaQuestion(
+                        claim=q["translated_question"],
+                        answer=correct_index,  # Index of correct answer (0-3)
+                        type="multiple",
+                        options=shuffled_answers,  # 4 shuffled answers
+                    ))
 
                 else:
-                    logger.warning(f"Unknown question type: {q['type']}")
+                    logger.warning("Unknown question type: %s", q['type'])
                     continue
 
             except Exception as e:
-                logger.error(f"Error processing question {idx+1}: {type(e).__name__}: {e}")
+                logger.error("Error processing question %s: %s: %s", idx+1, type(e).__name__, e)
                 continue
 
         if len(processed_questions) < count:
-            logger.warning(f"Only {len(processed_questions)} valid questions out of {count}")
+            logger.warning("Only %s valid questions out of %s", len(processed_questions), count)
 
         if not processed_questions:
             return False, "Failed to process questions. Please try again."
 
-        logger.info(f"Successfully processed {len(processed_questions)} trivia questions")
+        logger.info("Successfully processed %s trivia questions", len(processed_questions))
         return True, processed_questions
 
     except httpx.TimeoutException:
@@ -1071,15 +1717,99 @@ async def fetch_opentdb_questions(category_id: int = 0, language_code: str = "en
         return False, "Connection to trivia database timed out. Please try again."
 
     except httpx.HTTPError as e:
-        logger.error(f"OpenTDB HTTP error: {e}")
+        logger.error("OpenTDB HTTP error: %s", e)
         return False, "Failed to connect to trivia database. Please try again."
 
     except Exception as e:
         error_type = type(e).__name__
-        logger.error(f"OpenTDB fetch failed ({error_type}): {str(e)}")
+        logger.error("OpenTDB fetch failed (%s): %s", error_type, e)
         return False, f"Failed to fetch questions: {error_type}"
 
 
+async def refill_trivia_pool(category_id: int, language_code: str) -> None:
+    """
+    Fetch question sets in the background until the pool for a category/language is full.
+
+    Args:
+        category_id: OpenTDB category ID (0 for all categories)
+        language_code: Language the questions are translated to
+    """
+    key = (category_id, language_code)
+    pool = trivia_question_pool[key]
+    try:
+        while len(pool) < TRIVIA_POOL_SIZE:
+            async with trivia_pool_refill_lock:
+                success, result = await fetch_opentdb_questions(
+                    category_id=category_id,
+                    language_code=language_code,
+                    count=TRIVIA_QUESTIONS_PER_GAME,
+                    background=True
+                )
+
+            if not success or len(result) < TRIVIA_QUESTIONS_PER_GAME:
+                logger.warning("Trivia pool refill failed for category %s (%s)", category_id, language_code)
+                break
+
+            pool.append(result)
+            logger.info("Trivia pool refilled for category %s (%s)", category_id, language_code)
+    finally:
+        trivia_pool_refills_pending.discard(key)
+
+
+async def get_trivia_questions(category_id: int, language_code: str) -> tuple[bool, Any]:
+    """
+    Get a question set for a new game, from the pool if one is ready.
+    Schedules a background refill so the next game in this category starts instantly.
+
+    Args:
+        category_id: OpenTDB category ID (0 for all categories)
+        language_code: Target language code for translation
+
+    Returns:
+        Same as fetch_opentdb_questions
+    """
+    key = (category_id, language_code)
+    pool = trivia_question_pool[key]
+
+    if pool:
+        logger.info("Using pooled trivia questions for category %s (%s)", category_id, language_code)
+        result = (True, pool.popleft())
+    else:
+        result = await fetch_opentdb_questions(
+            category_id=category_id,
+            language_code=language_code,
+            count=TRIVIA_QUESTIONS_PER_GAME
+        )
+
+    if len(pool) < TRIVIA_POOL_SIZE and key not in trivia_pool_refills_pending:
+        trivia_pool_refills_pending.add(key)
+        task = asyncio.create_task(refill_trivia_pool(category_id, language_code))
+        trivia_pool_tasks.add(task)
+        task.add_done_callback(trivia_pool_tasks.discard)
+
+    return result
+
+
+@lru_cache(maxsize=TRIVIA_QUESTIONS_PER_GAME)
+def build_boolean_answer_keyboard(question_index: int) -> InlineKeyboardMarkup:
+    """
+    Build the True/False answer keyboard for a question.
+    Only the question index varies, so markups are cached and shared between games.
+
+    Args:
+        question_index: Index of the question in the game
+
+    Returns:
+        InlineKeyboardMarkup with the two answer buttons
+    """
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton("✓ Правда", callback_data=f"trivia_answer_{question_index}_1"),
+            InlineKeyboardButton("✗ Ложь", callback_data=f"trivia_answer_{question_index}_0")
+        ]
+    ])
+
+
 async def send_trivia_question(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int) -> None:
     """
     Send the current trivia question to the user.
@@ -1092,13 +1822,13 @@ async def send_trivia_question(update: Update, context: ContextTypes.DEFAULT_TYP
     """
     game_state = trivia_games.get(user_id)
 
-    if not game_state or not game_state.get("active"):
-        logger.warning(f"No active game for user {user_id}")
+    if game_state is None or not game_state.active:
+        logger.warning("No active game for user %s", user_id)
         return
 
-    questions = game_state["questions"]
-    current_index = game_state["current_index"]
-    score = game_state["score"]
+    questions = game_state.questions
+    current_index = game_state.current_index
+    score = game_state.score
 
     if current_index >= len(questions):
         # Game over
@@ -1108,21 +1838,16 @@ async def send_trivia_question(update: Update, context: ContextTypes.DEFAULT_TYP
     question = questions[current_index]
     question_number = current_index + 1
     total_questions = len(questions)
-    question_type = question.get("type", "boolean")
+    question_type = question.type
 
     # Create inline keyboard based on question type
     if question_type == "boolean":
-        # Boolean question: True/False buttons
-        keyboard = [
-            [
-                InlineKeyboardButton("✓ Правда", callback_data=f"trivia_answer_{current_index}_1"),
-                InlineKeyboardButton("✗ Ложь", callback_data=f"trivia_answer_{current_index}_0")
-            ]
-        ]
+        # Boolean question: True/False buttons (same markup for every game)
+        reply_markup = build_boolean_answer_keyboard(current_index)
     elif question_type == "multiple":
         # Multiple choice: 4 answer buttons
         keyboard = []
-        options = question.get("options", [])
+        options = question.options
         # Create 2 rows with 2 buttons each for better mobile display
         for i in range(0, len(options), 2):
             row = []
@@ -1138,39 +1863,36 @@ async def send_trivia_question(update: Update, context: ContextTypes.DEFAULT_TYP
                     callback_data=f"trivia_answer_{current_index}_{j}"
                 ))
             keyboard.append(row)
+        reply_markup = InlineKeyboardMarkup(keyboard)
     else:
-        logger.error(f"Unknown question type: {question_type}")
+        logger.error("Unknown question type: %s", question_type)
         return
 
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     # Build question text (same format for both boolean and multiple choice)
-    # Show only question text, answers are in buttons
+    # Show only question text, answers are in buttons; the score line appears from question 2 on
+    question_text = f"*Question {question_number}/{total_questions}*\n\n{question.claim}"
     if question_number > 1:
-        question_text = (
-            f"*Question {question_number}/{total_questions}*\n\n"
-            f"{question['claim']}\n\n"
-            f"_Current score: {score}/{question_number - 1}_"
-        )
-    else:
-        question_text = (
-            f"*Question {question_number}/{total_questions}*\n\n"
-            f"{question['claim']}"
-        )
+        question_text += f"\n\n_Current score: {score}/{question_number - 1}_"
 
-    # Send question
-    if update.callback_query:
-        await update.callback_query.message.reply_text(
-            question_text,
-            reply_markup=reply_markup,
-            parse_mode="Markdown"
-        )
-    else:
-        await update.message.reply_text(
-            question_text,
-            reply_markup=reply_markup,
-            parse_mode="Markdown"
-        )
+    # Send question (in reply to the button's message or to the command)
+    reply_target = update.callback_query.message if update.callback_query else update.message
+    await reply_target.reply_text(
+        question_text,
+        reply_markup=reply_markup,
+        parse_mode="Markdown"
+    )
+
+
+# End-of-game messages by score percentage: TRIVIA_SCORE_MESSAGES[i] is shown from
+# TRIVIA_SCORE_THRESHOLDS[i - 1] percent up to (not including) TRIVIA_SCORE_THRESHOLDS[i]
+TRIVIA_SCORE_THRESHOLDS = (40, 60, 80, 100)
+TRIVIA_SCORE_MESSAGES = (
+    "Хорошая попытка! Сыграйте снова, чтобы улучшить свой результат!",
+    "Неплохо! Продолжайте учиться!",
+    "Хорошая работа! Вы справились!",
+    "Отличная работа! Вы действительно знаете факты!",
+    "Идеальный результат! Вы мастер викторины!",
+)
 
 
 async def end_trivia_game(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int) -> None:
@@ -1187,22 +1909,13 @@ async def end_trivia_game(update: Update, context: ContextTypes.DEFAULT_TYPE, us
     if not game_state:
         return
 
-    score = game_state["score"]
-    total = len(game_state["questions"])
+    score = game_state.score
+    total = len(game_state.questions)
 
     # Generate encouraging message based on score
     percentage = (score / total) * 100
 
-    if percentage == 100:
-        message = "Идеальный результат! Вы мастер викторины!"
-    elif percentage >= 80:
-        message = "Отличная работа! Вы действительно знаете факты!"
-    elif percentage >= 60:
-        message = "Хорошая работа! Вы справились!"
-    elif percentage >= 40:
-        message = "Неплохо! Продолжайте учиться!"
-    else:
-        message = "Хорошая попытка! Сыграйте снова, чтобы улучшить свой результат!"
+    message = TRIVIA_SCORE_MESSAGES[bisect_right(TRIVIA_SCORE_THRESHOLDS, percentage)]
 
     final_text = (
         f"🎮 *Игра окончена!*\n\n"
@@ -1214,40 +1927,34 @@ async def end_trivia_game(update: Update, context: ContextTypes.DEFAULT_TYPE, us
 
     # Clean up game state
     trivia_games.pop(user_id, None)
-    logger.info(f"Trivia game ended for user {user_id}. Score: {score}/{total}")
+    logger.info("Trivia game ended for user %s. Score: %s/%s", user_id, score, total)
 
-    # Send final message
-    if update.callback_query:
-        await update.callback_query.message.reply_text(
-            final_text,
-            parse_mode="Markdown"
-        )
-    else:
-        await update.message.reply_text(
-            final_text,
-            parse_mode="Markdown"
-        )
+    # Send final message (in reply to the button's message or to the command)
+    reply_target = update.callback_query.message if update.callback_query else update.message
+    await reply_target.reply_text(
+        final_text,
+        parse_mode="Markdown"
+    )
 
 
 async def trivia_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /trivia command - show category selection."""
     user_id = update.effective_user.id
 
-    logger.info(f"User {user_id} started trivia game")
+    logger.info("User %s started trivia game", user_id)
 
     # Get user's language preference (default to English)
-    language_code = user_preferences.get(user_id, "en")
-    language_name = LANGUAGE_NAMES.get(language_code, "English")
+    language_code = get_user_language(user_id) or "en"
+    language_name = get_language_name(language_code, "English")
 
-    # Check if user already has an active game
-    if user_id in trivia_games and trivia_games[user_id].get("active"):
+    # Check if user already has an active game (starting a new one cancels it)
+    previous_game = trivia_games.pop(user_id, None)
+    if previous_game and previous_game.active:
         await update.message.reply_text(
             "У вас уже есть активная игра в викторину!\n\n"
             "Сначала завершите текущую игру, или используйте /trivia снова, чтобы начать новую игру "
             "(это отменит текущую игру)."
         )
-        # Clean up old game
-        trivia_games.pop(user_id, None)
 
     # Show category selection
     # Create inline keyboard with category buttons (one button per row)
@@ -1274,34 +1981,35 @@ async def trivia_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     )
 
 
-async def trivia_button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def trivia_button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                 payload: str) -> None:
     """
     Handle button presses in trivia game.
     Supports category selection and answer buttons (boolean and multiple choice).
     Next question is shown automatically after a short pause.
+
+    Args:
+        update: Telegram update with the callback query
+        context: Callback context
+        payload: Callback data after the "trivia_" prefix
+                 ("category_{id}" or "answer_{q_idx}_{ans_idx}")
     """
     query = update.callback_query
     await query.answer()  # Acknowledge button press
 
     user_id = update.effective_user.id
-    callback_data = query.data
 
-    # Check if this is a trivia callback
-    if not callback_data.startswith("trivia_"):
-        return
-
-    # Parse callback data: trivia_category_{id} or trivia_answer_{q_idx}_{ans_idx}
-    parts = callback_data.split("_")
-    action = parts[1]  # "category" or "answer"
+    # Parse payload: category_{id} or answer_{q_idx}_{ans_idx}
+    action, _, args = payload.partition("_")  # action is "category" or "answer"
 
     # Handle category selection
     if action == "category":
-        category_id = int(parts[2])
+        category_id = int(args)
         category_name = TRIVIA_CATEGORIES.get(category_id, "Unknown")
 
         # Get user's language preference
-        language_code = user_preferences.get(user_id, "en")
-        language_name = LANGUAGE_NAMES.get(language_code, "English")
+        language_code = get_user_language(user_id) or "en"
+        language_name = get_language_name(language_code, "English")
 
         # Show loading message
         await query.edit_message_text(
@@ -1313,12 +2021,8 @@ async def trivia_button_callback(update: Update, context: ContextTypes.DEFAULT_T
             parse_mode="Markdown"
         )
 
-        # Fetch questions from OpenTDB
-        success, result = await fetch_opentdb_questions(
-            category_id=category_id,
-            language_code=language_code,
-            count=10
-        )
+        # Get questions (pre-fetched when available, otherwise from OpenTDB)
+        success, result = await get_trivia_questions(category_id, language_code)
 
         if not success:
             error_message = result
@@ -1331,25 +2035,24 @@ async def trivia_button_callback(update: Update, context: ContextTypes.DEFAULT_T
         questions = result
 
         # Make sure we have enough questions
-        if len(questions) < 10:
+        if len(questions) < TRIVIA_QUESTIONS_PER_GAME:
             await query.edit_message_text(
                 f"❌ Недостаточно вопросов (получено только {len(questions)}).\n\n"
                 "Попробуйте другую категорию с помощью /trivia"
             )
             return
 
-        # Initialize game state
-        trivia_games[user_id] = {
-            "questions": questions[:10],  # Use exactly 10 questions
-            "current_index": 0,
-            "score": 0,
-            "active": True,
-            "language_code": language_code,
-            "category_id": category_id,
-            "category_name": category_name
-        }
+        # Initialize game state (dropping games abandoned by other users)
+        prune_trivia_games()
+        trivia_games.pop(user_id, None)  # Re-inserted at the most recently active end
+        trivia_games[user_id] = TriviaGame(
+            questions=questions[:TRIVIA_QUESTIONS_PER_GAME],
+            language_code=language_code,
+            category_id=category_id,
+            category_name=category_name,
+        )
 
-        logger.info(f"Trivia game started for user {user_id}: {category_name} in {language_name}")
+        logger.info("Trivia game started for user %s: %s in %s", user_id, category_name, language_name)
 
         # Show welcome message
         await query.edit_message_text(
@@ -1367,33 +2070,33 @@ async def trivia_button_callback(update: Update, context: ContextTypes.DEFAULT_T
         return
 
     # For answer and next actions, check if user has an active game
-    if user_id not in trivia_games or not trivia_games[user_id].get("active"):
+    game_state = trivia_games.get(user_id)
+    if game_state is None or not game_state.active:
         await query.edit_message_text(
             "❌ Эта игра истекла или уже была завершена.\n\n"
             "Используйте /trivia, чтобы начать новую игру!"
         )
         return
 
-    game_state = trivia_games[user_id]
-
     # Handle answer buttons
     if action == "answer":
-        question_index = int(parts[2])
-        answer_index = int(parts[3])
+        question_index, _, answer_index = args.partition("_")
+        question_index = int(question_index)
+        answer_index = int(answer_index)
 
         # Verify this is the current question (prevent double-answering)
-        if question_index != game_state["current_index"]:
+        if question_index != game_state.current_index:
             await query.edit_message_text(
                 "❌ На этот вопрос уже был дан ответ.\n\n"
                 "Пожалуйста, подождите следующий вопрос..."
             )
             return
 
-        questions = game_state["questions"]
+        questions = game_state.questions
         current_question = questions[question_index]
-        question_type = current_question.get("type", "boolean")
-        correct_answer = current_question["answer"]
-        explanation = current_question.get("explanation", "N/A")
+        question_type = current_question.type
+        correct_answer = current_question.answer
+        explanation = current_question.explanation
 
         # Check if answer is correct
         if question_type == "boolean":
@@ -1405,15 +2108,14 @@ async def trivia_button_callback(update: Update, context: ContextTypes.DEFAULT_T
         elif question_type == "multiple":
             # For multiple choice: answer_index is 0-3
             is_correct = (answer_index == correct_answer)
-            options = current_question.get("options", [])
-            correct_answer_text = options[correct_answer] if correct_answer < len(options) else "Unknown"
+            correct_answer_text = current_question.options[correct_answer]
 
         else:
-            logger.error(f"Unknown question type: {question_type}")
+            logger.error("Unknown question type: %s", question_type)
             return
 
         if is_correct:
-            game_state["score"] += 1
+            game_state.score += 1
             result_emoji = "✅"
             result_text = "Правильно!"
         else:
@@ -1421,11 +2123,11 @@ async def trivia_button_callback(update: Update, context: ContextTypes.DEFAULT_T
             result_text = f"Неправильно! Правильный ответ: {correct_answer_text}."
 
         # Update current index
-        game_state["current_index"] += 1
+        game_state.current_index += 1
+        touch_trivia_game(user_id, game_state)
 
-        score = game_state["score"]
+        score = game_state.score
         question_number = question_index + 1
-        total_questions = len(questions)
 
         # Build response message
         if explanation and explanation != "N/A":
@@ -1446,25 +2148,55 @@ async def trivia_button_callback(update: Update, context: ContextTypes.DEFAULT_T
             parse_mode="Markdown"
         )
 
-        logger.info(f"User {user_id} answered question {question_number}: {'correct' if is_correct else 'wrong'}")
-
-        # Wait 2.5 seconds before showing next question
-        await asyncio.sleep(2.5)
+        logger.info("User %s answered question %s: %s", user_id, question_number, 'correct' if is_correct else 'wrong')
 
-        # Automatically show next question or end game
-        if game_state["current_index"] < total_questions:
-            # More questions to go
-            await send_trivia_question(update, context, user_id)
-        else:
-            # Game over
-            await end_trivia_game(update, context, user_id)
+        # Show the next question after a short pause, without holding up this callback
+        # (updates are processed one at a time, so sleeping here would delay every user)
+        context.application.create_task(
+            show_next_trivia_step(update, context, user_id, game_state),
+            update=update
+        )
 
         return
 
 
+async def show_next_trivia_step(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int, game_state: TriviaGame
+) -> None:
+    """
+    Show the next trivia question, or the final score, once the answer feedback has been seen.
+
+    Args:
+        update: Telegram update object of the answer
+        context: Telegram context
+        user_id: User ID
+        game_state: The game the answer belonged to
+    """
+    await asyncio.sleep(TRIVIA_NEXT_QUESTION_DELAY)
+
+    if trivia_games.get(user_id) is not game_state or not game_state.active:
+        return  # Game was ended or replaced by a new one in the meantime
+
+    # Automatically show next question or end game
+    if game_state.current_index < len(game_state.questions):
+        # More questions to go
+        await send_trivia_question(update, context, user_id)
+    else:
+        # Game over
+        await end_trivia_game(update, context, user_id)
+
+
+# Callback query handlers keyed by the callback data prefix (text before the first "_").
+# Each handler receives the rest of the callback data as its payload argument.
+CALLBACK_HANDLERS: Dict[str, Callable] = {
+    "lang": language_button_callback,
+    "trivia": trivia_button_callback,
+}
+
+
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle errors in the bot."""
-    logger.error(f"Update {update} caused error {context.error}")
+    logger.error("Update %s caused error %s", update, context.error)
 
     if update and update.effective_message:
         await update.effective_message.reply_text(
@@ -1476,28 +2208,56 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 app_instance = None
 
 
-def shutdown_handler(signum, frame):
+def shutdown_handler(signum: int) -> None:
     """
     Handle shutdown signals (SIGINT, SIGTERM) gracefully.
-    Allows in-flight requests to complete before shutdown.
+    Registered with loop.add_signal_handler, so it runs inside the event loop
+    thread and lets in-flight requests complete before shutdown.
     """
-    logger.warning(f"Received shutdown signal: {signum}")
+    logger.warning("Received shutdown signal: %s", signal.Signals(signum).name)
     print("\n\nShutting down gracefully...")
     print("Waiting for in-flight requests to complete...")
 
     if app_instance:
+        # Stops polling; run_polling then awaits stop() and shutdown() for us
+        app_instance.stop_running()
+
+
+async def warm_up_groq_connection() -> None:
+    """
+    Open a pooled connection to Groq before the first user request arrives.
+    Best-effort - failures are logged and the bot starts anyway.
+    """
+    try:
+        await groq_client.models.list(timeout=GROQ_WARMUP_TIMEOUT)
+        logger.info("Groq connection warmed up")
+    except Exception as e:
+        logger.warning("Groq connection warm-up failed (%s): %s", type(e).__name__, e)
+
+
+async def release_resources() -> None:
+    """Stop background tasks and close network clients once the application has shut down."""
+    for task in list(trivia_pool_tasks):
+        task.cancel()
+
+    if preference_writer_task:
+        preference_writer_task.cancel()
+    await flush_user_preferences()
+
+    if groq_client:
         try:
-            # Stop the bot gracefully
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                loop.create_task(app_instance.stop())
-                loop.create_task(app_instance.shutdown())
+            await groq_client.close()
         except Exception as e:
-            logger.error(f"Error during shutdown: {e}")
+            logger.error("Error during shutdown: %s", e)
+
+    if opentdb_client:
+        try:
+            await opentdb_client.aclose()
+        except Exception as e:
+            logger.error("Error during shutdown: %s", e)
 
     logger.info("Bot shutdown complete")
     print("Shutdown complete. Goodbye!")
-    sys.exit(0)
 
 
 # ==============================================================================
@@ -1507,19 +2267,24 @@ def shutdown_handler(signum, frame):
 # Track bot start time for uptime reporting
 bot_start_time = datetime.now()
 
+# Reused compact encoder for the health endpoint (the most frequently hit route)
+health_json_encoder = json.JSONEncoder(separators=(",", ":"))
+
 async def health_check(request):
     """Health check endpoint for monitoring and keeping Render awake."""
-    uptime = datetime.now() - bot_start_time
+    now = datetime.now()
+    uptime = now - bot_start_time
     uptime_seconds = int(uptime.total_seconds())
 
-    return web.json_response({
+    body = health_json_encoder.encode({
         "status": "ok",
         "bot": "telegram-translation-bot",
         "uptime_seconds": uptime_seconds,
         "uptime": str(uptime).split('.')[0],  # Format: HH:MM:SS
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": now.isoformat(),
         "message": "Bot is running"
     })
+    return web.Response(body=body.encode(), content_type="application/json")
 
 async def root_handler(request):
     """Root endpoint with bot information."""
@@ -1543,13 +2308,18 @@ async def start_health_server(port: int = 8080):
     site = web.TCPSite(runner, '0.0.0.0', port)
     await site.start()
 
-    logger.info(f"Health check server started on port {port}")
+    logger.info("Health check server started on port %s", port)
     print(f"Health check server: http://0.0.0.0:{port}/health")
 
 
 def main() -> None:
     """Start the bot with production configuration."""
-    global groq_client, app_instance
+    global groq_client, opentdb_client, app_instance
+
+    # Use the libuv-based event loop when uvloop is installed (run_polling picks up the policy)
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop event loop")
 
     # Get bot token from environment variable
     token = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -1570,10 +2340,6 @@ def main() -> None:
         print("\nGet your API key from: https://console.groq.com/\n")
         return
 
-    # Register shutdown handlers for graceful shutdown
-    signal.signal(signal.SIGINT, shutdown_handler)
-    signal.signal(signal.SIGTERM, shutdown_handler)
-
     try:
         # Initialize Groq client
         # Check if SSL verification should be disabled (for testing in corporate networks)
@@ -1581,17 +2347,43 @@ def main() -> None:
 
         if disable_ssl:
             logger.warning("⚠️  SSL verification is DISABLED - only use for testing!")
-            # Create custom httpx client with SSL verification disabled
             ssl_context = ssl.create_default_context()
             ssl_context.check_hostname = False
             ssl_context.verify_mode = ssl.CERT_NONE
-            http_client = httpx.AsyncClient(verify=ssl_context)
-            groq_client = AsyncGroq(api_key=groq_api_key, http_client=http_client)
+            verify = ssl_context
+        else:
+            verify = True
+
+        # One pooled HTTP client shared by all Groq requests, sized for concurrent users
+        http_client = httpx.AsyncClient(
+            verify=verify,
+            limits=httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=GROQ_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(TRANSCRIPTION_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT),
+        )
+        # Retries are left to async_retry: SDK retries would multiply the request
+        # timeouts (and retry 5xx a second time) before any error reached the user
+        groq_client = AsyncGroq(api_key=groq_api_key, http_client=http_client, max_retries=0)
+
+        if disable_ssl:
             logger.info("Groq client initialized (SSL verification disabled)")
         else:
-            groq_client = AsyncGroq(api_key=groq_api_key)
             logger.info("Groq client initialized successfully")
 
+        # Trivia questions come from OpenTDB; one client keeps its connection alive between games
+        opentdb_client = httpx.AsyncClient(
+            verify=verify,
+            limits=httpx.Limits(
+                max_connections=OPENTDB_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENTDB_MAX_CONNECTIONS,
+                keepalive_expiry=OPENTDB_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(OPENTDB_TIMEOUT, connect=OPENTDB_CONNECT_TIMEOUT),
+        )
+
         # Create the Application
         logger.info("Starting Telegram Translation Bot (Phase 4 - Production Ready)...")
 
@@ -1600,10 +2392,41 @@ def main() -> None:
 
         # Create application with post_init callback for health server
         async def post_init_callback(app):
-            """Start health check server after bot initialization."""
+            """Load saved preferences, start background tasks and register shutdown handlers."""
+            global preference_writer_task
+
+            try:
+                saved_preferences = await asyncio.to_thread(load_user_preferences, PREFERENCES_DB_PATH)
+                user_preferences.update(saved_preferences)
+                logger.info("Loaded %s saved language preferences", len(saved_preferences))
+            except Exception as e:
+                logger.error("Failed to load user preferences (%s): %s", type(e).__name__, e)
+            preference_writer_task = asyncio.create_task(preference_writer())
+
+            await warm_up_groq_connection()
             await start_health_server(port)
 
-        application = Application.builder().token(token).post_init(post_init_callback).build()
+            # Register shutdown handlers for graceful shutdown
+            loop = asyncio.get_running_loop()
+            try:
+                for sig in (signal.SIGINT, signal.SIGTERM):
+                    loop.add_signal_handler(sig, shutdown_handler, sig)
+            except NotImplementedError:
+                # Event loops on Windows don't support signal handlers; run_polling's
+                # own KeyboardInterrupt handling still shuts the bot down cleanly
+                logger.warning("Signal handlers are not supported on this platform")
+
+        async def post_shutdown_callback(app):
+            """Release network resources after the bot has stopped."""
+            await release_resources()
+
+        application = (
+            Application.builder()
+            .token(token)
+            .post_init(post_init_callback)
+            .post_shutdown(post_shutdown_callback)
+            .build()
+        )
         app_instance = application
 
         # Register command handlers
@@ -1648,7 +2471,7 @@ def main() -> None:
         print("\n\nShutting down...")
 
     except Exception as e:
-        logger.error(f"Failed to start bot: {e}")
+        logger.error("Failed to start bot: %s", e)
         print(f"\nError starting bot: {e}")
         print("Please check your TELEGRAM_BOT_TOKEN and try again.\n")
 
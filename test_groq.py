@@ -4,13 +4,33 @@ Quick test script to diagnose Groq API issues
 """
 import os
 import asyncio
+import traceback
+import httpx
 from dotenv import load_dotenv
 from groq import AsyncGroq
 
-async def test_groq():
-    # Load environment variables
-    load_dotenv()
+# Load environment variables (once per process, at import)
+load_dotenv()
+
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+# Request payloads are constant, so build them once (the SDK only reads them)
+TRANSLATION_MESSAGES = [
+    {
+        "role": "system",
+        "content": "You are a translator. Translate the following text to Spanish. Only provide the translation, no explanations."
+    },
+    {
+        "role": "user",
+        "content": "Hello, how are you?"
+    }
+]
+CONNECTIVITY_MESSAGES = [{"role": "user", "content": "Hi"}]
 
+# The SDK retries rate limits, 5xx and connection errors itself, honouring retry-after
+GROQ_MAX_RETRIES = 3
+
+async def test_groq():
     groq_api_key = os.getenv("GROQ_API_KEY")
 
     if not groq_api_key or groq_api_key == "your_groq_api_key_here":
@@ -20,53 +40,47 @@ async def test_groq():
 
     print(f"✓ API key found (first 10 chars): {groq_api_key[:10]}...")
 
-    # Initialize Groq client
-    try:
-        client = AsyncGroq(api_key=groq_api_key)
-        print("✓ Groq client initialized")
-    except Exception as e:
-        print(f"❌ Failed to initialize Groq client: {e}")
-        return
+    # One pooled client for all test calls, so they share established connections
+    async with httpx.AsyncClient(limits=HTTP_LIMITS, timeout=30.0) as http_client:
+        # Initialize Groq client
+        try:
+            client = AsyncGroq(api_key=groq_api_key, http_client=http_client, max_retries=GROQ_MAX_RETRIES)
+            print("✓ Groq client initialized")
+        except Exception as e:
+            print(f"❌ Failed to initialize Groq client: {e}")
+            return
 
-    # Test 1: Simple translation
-    print("\n--- Test 1: Translation ---")
-    try:
-        response = await client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a translator. Translate the following text to Spanish. Only provide the translation, no explanations."
-                },
-                {
-                    "role": "user",
-                    "content": "Hello, how are you?"
-                }
-            ],
-            temperature=0.3,
-            max_tokens=1024
+        # Both tests are independent, so run them concurrently
+        translation_result, connectivity_result = await asyncio.gather(
+            # Test 1: Simple translation
+            client.chat.completions.create(
+                model="llama-3.3-70b-versatile",
+                messages=TRANSLATION_MESSAGES,
+                temperature=0.3,
+                max_tokens=1024
+            ),
+            # Test 2: Check API connectivity with a minimal request
+            client.chat.completions.create(
+                model="llama-3.3-70b-versatile",
+                messages=CONNECTIVITY_MESSAGES,
+                max_tokens=10
+            ),
+            return_exceptions=True
         )
-        translation = response.choices[0].message.content.strip()
-        print(f"✓ Translation successful: {translation}")
-    except Exception as e:
-        print(f"❌ Translation failed: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
+
+    print("\n--- Test 1: Translation ---")
+    if isinstance(translation_result, Exception):
+        print(f"❌ Translation failed: {type(translation_result).__name__}: {translation_result}")
+        traceback.print_exception(translation_result)
         return
+    translation = translation_result.choices[0].message.content.strip()
+    print(f"✓ Translation successful: {translation}")
 
-    # Test 2: List available models (optional)
     print("\n--- Test 2: Check API connectivity ---")
-    try:
-        # Try a minimal request
-        response = await client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": "Hi"}],
-            max_tokens=10
-        )
-        print(f"✓ API connectivity OK")
-    except Exception as e:
-        print(f"❌ API connectivity issue: {type(e).__name__}: {e}")
+    if isinstance(connectivity_result, Exception):
+        print(f"❌ API connectivity issue: {type(connectivity_result).__name__}: {connectivity_result}")
         return
+    print(f"✓ API connectivity OK")
 
     print("\n✅ All tests passed! Groq API is working correctly.")
     print("\nIf the bot still fails, the issue might be:")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script for the "already in the target language" shortcut.
+Languages that share a script with a supported language must never match it,
+otherwise the bot replies that no translation is needed and translates nothing.
+"""
+
+import sys
+
+from main import detect_script_language
+
+# (text, expected result)
+SAMPLES = [
+    # Matches
+    ("Это был хороший день, мы гуляли в парке.", "ru"),
+    ("مرحبا، كيف حالك اليوم؟", "ar"),
+    ("今日はとても良い天気ですね。", "ja"),
+    ("안녕하세요, 오늘 날씨가 좋네요.", "ko"),
+    # Ukrainian: shares Cyrillic with Russian
+    ("Привіт, як справи? Сьогодні гарна погода.", None),
+    ("Добрий день, дякую за допомогу.", None),
+    # Bulgarian: no letters of its own outside Russian's alphabet
+    ("Здравей, как си? Времето днес е хубаво.", None),
+    ("Благодаря ти за помощта, ще се видим утре.", None),
+    # Serbian and Kazakh Cyrillic
+    ("Добар дан, како сте? Хвала на помоћи.", None),
+    ("Сәлеметсіз бе, қалыңыз қалай?", None),
+    # Marathi and Nepali: share Devanagari with Hindi
+    ("आज हवामान खूप छान आहे, आपण बाहेर जाऊया.", None),
+    ("तपाईंलाई कस्तो छ? आज मौसम राम्रो छ।", None),
+    # Hindi itself is left to the model (Devanagari is not shortcut)
+    ("आज मौसम बहुत अच्छा है।", None),
+    # CJK ideographs without kana may be Chinese or Japanese
+    ("今天天气很好。", None),
+    # Persian: shares the Arabic script
+    ("سلام، حال شما چطور است؟", None),
+    # Latin script and text without letters
+    ("Hello, how are you?", None),
+    ("12345 !!!", None),
+]
+
+
+def test_detect_script_language():
+    """Every sample must be detected as expected."""
+    for text, expected in SAMPLES:
+        assert detect_script_language(text) == expected, text
+
+
+if __name__ == "__main__":
+    failures = 0
+    for text, expected in SAMPLES:
+        result = detect_script_language(text)
+        if result == expected:
+            print(f"✓ {text!r} -> {result}")
+        else:
+            failures += 1
+            print(f"❌ {text!r} -> {result} (expected {expected})")
+
+    if failures:
+        print(f"\n❌ {failures} sample(s) failed")
+        sys.exit(1)
+    print("\n✅ All samples detected correctly")
@@ -5,41 +5,38 @@ Run this to verify the Groq API integration works correctly.
 """
 
 import asyncio
+import hashlib
 import json
 import os
 import sys
+import httpx
 from dotenv import load_dotenv
 from groq import AsyncGroq
 
 # Load environment variables
 load_dotenv()
 
-async def test_question_generation():
-    """Test trivia question generation."""
-    groq_api_key = os.getenv("GROQ_API_KEY")
-
-    if not groq_api_key:
-        print("❌ GROQ_API_KEY not found in .env file")
-        return False
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
 
-    print("✓ GROQ_API_KEY found")
-
-    # Initialize Groq client
-    groq_client = AsyncGroq(api_key=groq_api_key)
-    print("✓ Groq client initialized")
+# One concurrent request per question: (expected answer, topic), so answers stay
+# mixed and the parallel requests don't all pick the same subject
+QUESTION_SPECS = (
+    (True, "animals or the human body"),
+    (False, "science, technology or space"),
+    (True, "history, geography or food"),
+)
 
-    # Generate test questions
-    print("\n📝 Generating 3 test trivia questions...\n")
+# Prompts are constant, so they're built once at import
+TRIVIA_SYSTEM_PROMPT = "You are a trivia question generator. You create interesting true/false questions. You ONLY respond with valid JSON arrays."
 
-    prompt = """Generate exactly 3 weird, surprising, and interesting true-or-false claims about the world.
-Make them fun and engaging! Mix true and false claims (roughly 50/50 split).
-Topics can include: animals, science, history, geography, technology, human body, space, food, etc.
+TRIVIA_PROMPT = """Generate exactly 1 weird, surprising, and interesting true-or-false claim about the world.
+Make it fun and engaging!
 
 Requirements:
-- Each claim should be clear and specific
+- The claim should be clear and specific
 - Avoid controversial or offensive topics
-- Make them surprising or counterintuitive
-- Include a brief (1-2 sentence) explanation for each
+- Make it surprising or counterintuitive
+- Include a brief (1-2 sentence) explanation
 
 Return ONLY a valid JSON array with this exact structure:
 [
@@ -52,78 +49,190 @@ Return ONLY a valid JSON array with this exact structure:
 
 Return ONLY the JSON array, no other text."""
 
-    try:
-        chat_completion = await asyncio.wait_for(
-            groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a trivia question generator. You create interesting true/false questions. You ONLY respond with valid JSON arrays."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model="llama-3.3-70b-versatile",
-                temperature=0.8,
-                max_tokens=2048,
-            ),
-            timeout=30
-        )
-
-        response_text = chat_completion.choices[0].message.content.strip()
-        print("✓ Received response from Groq")
-        print(f"\nRaw response:\n{response_text}\n")
-
-        # Extract JSON
-        import re
-        json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-        if json_match:
-            json_text = json_match.group(0)
-        else:
-            json_text = response_text
-
-        # Parse JSON
-        questions = json.loads(json_text)
-        print("✓ Successfully parsed JSON")
-
-        # Validate structure
-        if not isinstance(questions, list):
-            print("❌ Response is not a list")
-            return False
+# Fields every generated question must have
+REQUIRED_QUESTION_KEYS = frozenset(("claim", "answer", "explanation"))
 
-        if len(questions) == 0:
-            print("❌ No questions generated")
-            return False
+# The SDK retries rate limits, 5xx and connection errors itself, honouring retry-after
+GROQ_MAX_RETRIES = 3
+
+# Opt-in on-disk cache of Groq responses for repeated dev/CI runs (GROQ_TEST_CACHE=1)
+RESPONSE_CACHE_ENABLED = os.getenv("GROQ_TEST_CACHE") == "1"
+RESPONSE_CACHE_DIR = ".groq_cache"
 
-        print(f"✓ Generated {len(questions)} questions\n")
+def response_cache_path(request: dict) -> str:
+    """Cache file for a request, keyed on a hash of its model, messages and sampling settings."""
+    key = hashlib.blake2b(json.dumps(request, sort_keys=True).encode(), digest_size=16).hexdigest()
+    return os.path.join(RESPONSE_CACHE_DIR, f"{key}.txt")
 
-        # Display questions
-        for i, q in enumerate(questions, 1):
-            if not all(key in q for key in ["claim", "answer", "explanation"]):
-                print(f"❌ Question {i} missing required fields")
+def load_cached_response(request: dict):
+    """Return the cached response text for a request, or None on a miss (or if caching is off)."""
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    try:
+        with open(response_cache_path(request), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def save_cached_response(request: dict, response_text: str) -> None:
+    """Store the response text for a request if caching is on."""
+    if not RESPONSE_CACHE_ENABLED:
+        return
+    os.makedirs(RESPONSE_CACHE_DIR, exist_ok=True)
+    with open(response_cache_path(request), "w", encoding="utf-8") as f:
+        f.write(response_text)
+
+async def read_json_array(stream) -> str:
+    """
+    Collect streamed completion text until the first top-level JSON array closes,
+    then stop reading so parsing doesn't wait for the rest of the generation.
+    Brackets inside JSON strings are ignored.
+    """
+    parts = []
+    depth = 0
+    in_string = escaped = False
+
+    async with stream:
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
                 continue
 
-            print(f"Question {i}:")
-            print(f"  Claim: {q['claim']}")
-            print(f"  Answer: {q['answer']}")
-            print(f"  Explanation: {q['explanation']}")
-            print()
+            for i, char in enumerate(delta):
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == "\\":
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                elif char == "[":
+                    depth += 1
+                elif depth == 0:
+                    continue  # Text before the array starts
+                elif char == '"':
+                    in_string = True
+                elif char == "]":
+                    depth -= 1
+                    if depth == 0:
+                        parts.append(delta[:i + 1])
+                        return "".join(parts)
+
+            parts.append(delta)
+
+    return "".join(parts)
 
-        print("✅ All tests passed! Trivia game is ready to use.")
-        return True
+async def test_question_generation():
+    """Test trivia question generation."""
+    groq_api_key = os.getenv("GROQ_API_KEY")
 
-    except json.JSONDecodeError as e:
-        print(f"❌ Failed to parse JSON: {e}")
-        return False
-    except asyncio.TimeoutError:
-        print("❌ Request timed out")
-        return False
-    except Exception as e:
-        print(f"❌ Error: {type(e).__name__}: {e}")
+    if not groq_api_key:
+        print("❌ GROQ_API_KEY not found in .env file")
         return False
 
+    print("✓ GROQ_API_KEY found")
+
+    async with httpx.AsyncClient(limits=HTTP_LIMITS, timeout=30.0) as http_client:
+        # Initialize Groq client
+        groq_client = AsyncGroq(api_key=groq_api_key, http_client=http_client, max_retries=GROQ_MAX_RETRIES)
+        print("✓ Groq client initialized")
+
+        # Generate test questions
+        print(f"\n📝 Generating {len(QUESTION_SPECS)} test trivia questions...\n")
+
+        try:
+            async def generate_question(answer: bool, topic: str) -> tuple:
+                """Return (request, response text, whether it came from the cache)."""
+                request = dict(
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": TRIVIA_SYSTEM_PROMPT
+                        },
+                        {
+                            "role": "user",
+                            "content": f"{TRIVIA_PROMPT}\n\nTopic: {topic}. The claim must be {'true' if answer else 'false'}."
+                        }
+                    ],
+                    model="llama-3.3-70b-versatile",
+                    temperature=0.8,
+                    max_tokens=150,  # One short question plus JSON scaffolding
+                )
+                response_text = load_cached_response(request)
+                if response_text is not None:
+                    return request, response_text, True
+                stream = await groq_client.chat.completions.create(**request, stream=True)
+                return request, await read_json_array(stream), False
+
+            # One request per question, all in flight at once; each gets its own 30s deadline
+            responses = await asyncio.gather(*(
+                asyncio.wait_for(generate_question(answer, topic), timeout=30)
+                for answer, topic in QUESTION_SPECS
+            ))
+            print("✓ Received responses from Groq")
+
+            questions = []
+            for request, response_text, from_cache in responses:
+                response_text = response_text.strip()
+                print(f"\nRaw response:\n{response_text}\n")
+
+                # Extract JSON (from the first "[" to the last "]")
+                start = response_text.find("[")
+                end = response_text.rfind("]")
+                if start != -1 and end > start:
+                    json_text = response_text[start:end + 1]
+                else:
+                    json_text = response_text
+
+                # Parse JSON and validate structure
+                parsed = json.loads(json_text)
+                if not isinstance(parsed, list):
+                    print("❌ Response is not a list")
+                    return False
+                questions.extend(parsed)
+
+                # Only cache responses that parsed into complete questions
+                if not from_cache and parsed and all(
+                    isinstance(q, dict) and REQUIRED_QUESTION_KEYS <= q.keys() for q in parsed
+                ):
+                    save_cached_response(request, response_text)
+            print("✓ Successfully parsed JSON")
+
+            if len(questions) == 0:
+                print("❌ No questions generated")
+                return False
+
+            print(f"✓ Generated {len(questions)} questions\n")
+
+            # Display questions (built up and written to stdout in one go)
+            out = []
+            for i, q in enumerate(questions, 1):
+                if not isinstance(q, dict) or not REQUIRED_QUESTION_KEYS <= q.keys():
+                    out.append(f"❌ Question {i} missing required fields\n")
+                    continue
+
+                out.append(
+                    f"Question {i}:\n"
+                    f"  Claim: {q['claim']}\n"
+                    f"  Answer: {q['answer']}\n"
+                    f"  Explanation: {q['explanation']}\n\n"
+                )
+            sys.stdout.write("".join(out))
+            sys.stdout.flush()
+
+            print("✅ All tests passed! Trivia game is ready to use.")
+            return True
+
+        except json.JSONDecodeError as e:
+            print(f"❌ Failed to parse JSON: {e}")
+            return False
+        except asyncio.TimeoutError:
+            print("❌ Request timed out")
+            return False
+        except Exception as e:
+            print(f"❌ Error: {type(e).__name__}: {e}")
+            return False
+
 if __name__ == "__main__":
     print("🎮 Trivia Game - Question Generation Test\n")
     print("=" * 60)